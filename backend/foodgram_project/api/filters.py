@@ -1,3 +1,8 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import F, Q
+from django_filters.constants import EMPTY_VALUES
 from django_filters.rest_framework import FilterSet, filters
 
 from food_recipes.models import Ingredient, Recipe, Tag
@@ -13,6 +18,39 @@ class IngredientFilter(FilterSet):
         fields = ('name',)
 
 
+class RecipeOrderingFilter(filters.OrderingFilter):
+    """Сортировка рецептов.
+
+    popular - сначала самые популярные, при равном числе добавлений в
+    избранное новые раньше старых, как в индексе recipe_popularity_idx;
+    -popular - обратный порядок.
+    """
+
+    orderings = {
+        'popular': ('-favorites_count', '-id'),
+        'id': ('id',),
+    }
+
+    def get_ordering_value(self, param):
+        descending = param.startswith('-')
+        fields = self.orderings[param.lstrip('-')]
+        if not descending:
+            return fields
+        return tuple(
+            field[1:] if field.startswith('-') else f'-{field}'
+            for field in fields
+        )
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        return qs.order_by(*(
+            field
+            for param in value if param not in EMPTY_VALUES
+            for field in self.get_ordering_value(param)
+        ))
+
+
 class RecipeFilter(FilterSet):
     """Фильтр для модели Recipe."""
 
@@ -33,16 +71,27 @@ class RecipeFilter(FilterSet):
         label='В корзине'
     )
 
+    search = filters.CharFilter(
+        method='filter_search',
+        label='Поиск'
+    )
+
+    ordering = RecipeOrderingFilter(
+        fields=(('favorites_count', 'popular'), ('id', 'id')),
+        label='Сортировка'
+    )
+
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart',
+                  'search')
 
     def filter_is_favorited(self, queryset, name, value):
         user = self.request.user
         if value:
             if user.is_anonymous:
                 return queryset.none()
-            return queryset.filter(favorites__user=user)
+            return queryset.filter(is_favorited=True)
         return queryset
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
@@ -50,5 +99,21 @@ class RecipeFilter(FilterSet):
         if value:
             if user.is_anonymous:
                 return queryset.none()
-            return queryset.filter(shopping_list__user=user)
+            return queryset.filter(is_in_shopping_cart=True)
         return queryset
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск с ранжированием по SearchRank.
+
+        Вне PostgreSQL ищет вхождение строки в название и описание.
+        """
+        if connections[queryset.db].vendor != 'postgresql':
+            return queryset.filter(
+                Q(name__icontains=value) | Q(text__icontains=value)
+            )
+        query = SearchQuery(
+            value, config=settings.SEARCH_CONFIG, search_type='websearch'
+        )
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query)
+        ).order_by('-rank', '-pk')
@@ -0,0 +1,150 @@
+import json
+import statistics
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from food_recipes.models import Recipe, Tag
+
+User = get_user_model()
+
+
+def percentile(values, percent):
+    """Процентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    index = max(0, round(percent / 100 * len(ordered) + 0.5) - 1)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = 'Замеряет задержку и число запросов основных эндпоинтов API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument(
+            '--output', help='Сохранить результаты в JSON-файл.')
+        parser.add_argument(
+            '--compare', help='JSON-файл прошлого запуска для сравнения.')
+
+    def get_endpoints(self):
+        user = User.objects.annotate(
+            subscriptions_total=Count('subscriptions')
+        ).order_by('-subscriptions_total').first()
+        recipe = Recipe.objects.order_by('-pk').first()
+        tag = Tag.objects.first()
+        if user is None or recipe is None or tag is None:
+            raise CommandError(
+                'Нет данных, сначала выполните seed_synthetic.')
+        last_page = max(Recipe.objects.count() // settings.PAGE_SIZE, 1)
+        self.user = user
+        return {
+            'recipes_anonymous': ('/api/recipes/', False),
+            'recipes': ('/api/recipes/', True),
+            'recipes_limit_100': ('/api/recipes/?limit=100', True),
+            'recipes_last_page': (f'/api/recipes/?page={last_page}', True),
+            'recipes_cursor': ('/api/recipes/?pagination=cursor', True),
+            'recipes_by_tag': (f'/api/recipes/?tags={tag.slug}', True),
+            'recipes_favorited': ('/api/recipes/?is_favorited=1', True),
+            'recipes_search': ('/api/recipes/?search=суп', True),
+            'recipe_detail': (f'/api/recipes/{recipe.pk}/', True),
+            'users': ('/api/users/', True),
+            'users_me': ('/api/users/me/', True),
+            'subscriptions': (
+                '/api/users/subscriptions/?recipes_limit=3', True),
+            'tags': ('/api/tags/', True),
+            'ingredients': ('/api/ingredients/', True),
+            'ingredients_search': ('/api/ingredients/?name=мо', True),
+            'download_shopping_cart': (
+                '/api/recipes/download_shopping_cart/', True),
+        }
+
+    def measure(self, client, url, requests, warmup):
+        for _ in range(warmup):
+            self.get(client, url)
+        latencies = []
+        queries = []
+        for _ in range(requests):
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                response = self.get(client, url)
+                latencies.append(time.perf_counter() - start)
+            queries.append(len(context))
+        total = sum(latencies)
+        return {
+            'url': url,
+            'status': response.status_code,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'throughput_rps': requests / total if total else 0,
+            'queries': statistics.median(queries),
+        }
+
+    @staticmethod
+    def get(client, url):
+        response = client.get(url)
+        if getattr(response, 'streaming', False):
+            b''.join(response.streaming_content)
+        return response
+
+    def handle(self, *args, **options):
+        endpoints = self.get_endpoints()
+        token, _ = Token.objects.get_or_create(user=self.user)
+        host = next(
+            (host.lstrip('.') for host in settings.ALLOWED_HOSTS
+             if host != '*'),
+            'localhost',
+        )
+        clients = {
+            False: APIClient(SERVER_NAME=host),
+            True: APIClient(SERVER_NAME=host),
+        }
+        clients[True].credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        results = {}
+        for name, (url, authenticated) in endpoints.items():
+            results[name] = self.measure(
+                clients[authenticated], url,
+                options['requests'], options['warmup'],
+            )
+
+        previous = {}
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                previous = json.load(file)['endpoints']
+
+        self.stdout.write(
+            f'{"endpoint":<24}{"p50":>9}{"p95":>9}{"p99":>9}'
+            f'{"rps":>9}{"queries":>9}'
+        )
+        for name, result in results.items():
+            line = (
+                f'{name:<24}{result["p50_ms"]:>9.2f}{result["p95_ms"]:>9.2f}'
+                f'{result["p99_ms"]:>9.2f}{result["throughput_rps"]:>9.1f}'
+                f'{result["queries"]:>9g}'
+            )
+            if name in previous and previous[name]['p50_ms']:
+                change = result['p50_ms'] / previous[name]['p50_ms'] - 1
+                line += f'  p50 {change:+.0%}'
+            if result['status'] != 200:
+                line += f'  HTTP {result["status"]}'
+            self.stdout.write(line)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump({
+                    'created_at': datetime.now(timezone.utc).isoformat(),
+                    'requests': options['requests'],
+                    'recipes': Recipe.objects.count(),
+                    'users': User.objects.count(),
+                    'endpoints': results,
+                }, file, ensure_ascii=False, indent=2)
@@ -0,0 +1,109 @@
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.fast_serializers import RecipeFastSerializer
+from api.views import RecipeViewSet
+from food_recipes.models import Recipe
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает скорость сериализации страницы рецептов через '
+        'RecipeSerializer и RecipeFastSerializer.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=100)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[6, 100],
+            help='Размеры страниц.')
+
+    def get_view(self, user):
+        host = next(
+            (host.lstrip('.') for host in settings.ALLOWED_HOSTS
+             if host != '*'),
+            'localhost',
+        )
+        request = Request(APIRequestFactory().get(
+            '/api/recipes/', SERVER_NAME=host))
+        request.user = user
+        return RecipeViewSet(
+            request=request, args=(), kwargs={}, format_kwarg=None,
+            action='list',
+        )
+
+    @staticmethod
+    def serialize_drf(view, size):
+        page = list(view.get_queryset()[:size])
+        return view.get_serializer(page, many=True).data
+
+    @staticmethod
+    def serialize_fast(view, size):
+        rows = RecipeFastSerializer.get_values(view.get_queryset())[:size]
+        return RecipeFastSerializer(view.request).to_representation(rows)
+
+    def measure(self, serialize, view, size, iterations, warmup):
+        for _ in range(warmup):
+            serialize(view, size)
+        timings = []
+        for _ in range(iterations):
+            view.request._subscribed_author_ids = None
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                serialize(view, size)
+                timings.append(time.perf_counter() - start)
+        median = statistics.median(timings)
+        return median * 1000, size / median, len(context)
+
+    def handle(self, *args, **options):
+        if not Recipe.objects.exists():
+            raise CommandError('Нет данных, сначала выполните seed_synthetic.')
+        user = User.objects.annotate(
+            subscriptions_total=Count('subscriptions')
+        ).order_by('-subscriptions_total').first()
+
+        self.stdout.write(
+            f'{"user":<7}{"size":>6}{"serializer":>12}{"ms":>10}'
+            f'{"recipes/s":>12}{"queries":>9}'
+        )
+        for label, current_user in (('anon', AnonymousUser()),
+                                    ('auth', user)):
+            view = self.get_view(current_user)
+            for size in options['sizes']:
+                drf = json.dumps(self.serialize_drf(view, size))
+                fast = json.dumps(self.serialize_fast(view, size))
+                if drf != fast:
+                    raise CommandError(
+                        f'Ответы различаются: {label}, размер {size}')
+                results = {
+                    name: self.measure(
+                        serialize, view, size,
+                        options['iterations'], options['warmup'],
+                    )
+                    for name, serialize in (
+                        ('drf', self.serialize_drf),
+                        ('fast', self.serialize_fast),
+                    )
+                }
+                for name, (ms, rate, queries) in results.items():
+                    line = (
+                        f'{label:<7}{size:>6}{name:>12}{ms:>10.2f}'
+                        f'{rate:>12.0f}{queries:>9}'
+                    )
+                    if name == 'fast':
+                        line += f'  x{results["drf"][0] / ms:.1f}'
+                    self.stdout.write(line)
@@ -0,0 +1,97 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.text import compress_string
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api.middleware import brotli
+from api.renderers import FastJSONRenderer, orjson
+
+User = get_user_model()
+
+
+def median_ms(function, iterations):
+    """Медианное время вызова function в миллисекундах."""
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает размер ответов и время рендеринга JSON и сжатия '
+        'для списка рецептов и ингредиентов.'
+    )
+
+    endpoints = {
+        'recipes': '/api/recipes/',
+        'recipes_limit_100': '/api/recipes/?limit=100',
+        'ingredients': '/api/ingredients/',
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+
+    def get_data(self, client, url):
+        response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f'{url}: HTTP {response.status_code}')
+        return response.data
+
+    def handle(self, *args, **options):
+        user = User.objects.first()
+        if user is None:
+            raise CommandError(
+                'Нет данных, сначала выполните seed_synthetic.')
+        token, _ = Token.objects.get_or_create(user=user)
+        host = next(
+            (host.lstrip('.') for host in settings.ALLOWED_HOSTS
+             if host != '*'),
+            'localhost',
+        )
+        client = APIClient(SERVER_NAME=host)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        iterations = options['iterations']
+        if orjson is None:
+            self.stdout.write('orjson не установлен, FastJSONRenderer '
+                              'работает как JSONRenderer.')
+        if brotli is None:
+            self.stdout.write('brotli не установлен, br не замеряется.')
+
+        self.stdout.write(
+            f'{"endpoint":<20}{"json B":>9}{"drf ms":>8}{"fast ms":>9}'
+            f'{"gzip B":>9}{"gzip ms":>9}{"br B":>9}{"br ms":>8}'
+        )
+        for name, url in self.endpoints.items():
+            data = self.get_data(client, url)
+            content = JSONRenderer().render(data)
+            if FastJSONRenderer().render(data) != content:
+                self.stdout.write(self.style.WARNING(
+                    f'{name}: FastJSONRenderer отличается от JSONRenderer'))
+            drf_ms = median_ms(
+                lambda: JSONRenderer().render(data), iterations)
+            fast_ms = median_ms(
+                lambda: FastJSONRenderer().render(data), iterations)
+            gzip_size = len(compress_string(content))
+            gzip_ms = median_ms(lambda: compress_string(content), iterations)
+            line = (
+                f'{name:<20}{len(content):>9}{drf_ms:>8.2f}{fast_ms:>9.2f}'
+                f'{gzip_size:>9}{gzip_ms:>9.2f}'
+            )
+            if brotli is not None:
+                quality = settings.BROTLI_QUALITY
+                br_size = len(brotli.compress(content, quality=quality))
+                br_ms = median_ms(
+                    lambda: brotli.compress(content, quality=quality),
+                    iterations,
+                )
+                line += f'{br_size:>9}{br_ms:>8.2f}'
+            self.stdout.write(line)
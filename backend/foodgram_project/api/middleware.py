@@ -0,0 +1,188 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    """Считает SQL-запросы и время, проведенное в базе."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.monotonic()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.monotonic() - start
+            self.count += 1
+
+
+class QueryBudgetMiddleware:
+    """Отдает статистику запросов к базе и следит за бюджетами.
+
+    При DB_STATS_HEADERS добавляет заголовки X-DB-Queries и X-DB-Time,
+    а запросы, превысившие бюджет из QUERY_BUDGETS для своего
+    URL name и метода, пишутся в лог.
+
+    Запросы потокового ответа выполняются уже после get_response, пока
+    читается тело. Они учитываются в бюджете, который для такого ответа
+    проверяется при закрытии потока, но в заголовки не попадают:
+    заголовки уходят клиенту раньше тела.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    @staticmethod
+    def count_queries(stats):
+        """Контекст, в котором запросы ко всем базам идут в stats."""
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(stats))
+        return stack
+
+    @staticmethod
+    def check_budget(request, stats):
+        match = request.resolver_match
+        budget = None
+        if match is not None:
+            budget = settings.QUERY_BUDGETS.get(
+                match.view_name, {}
+            ).get(request.method)
+        if budget is not None and stats.count > budget:
+            logger.warning(
+                'Превышен бюджет запросов %s %s (%s): %d > %d',
+                request.method, request.path, match.view_name,
+                stats.count, budget,
+            )
+
+    def count_stream(self, request, content, stats):
+        """Считает запросы, выполненные при чтении тела ответа."""
+        iterator = iter(content)
+        try:
+            while True:
+                with self.count_queries(stats):
+                    chunk = next(iterator, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            self.check_budget(request, stats)
+
+    def __call__(self, request):
+        if not settings.DB_STATS_HEADERS and not settings.QUERY_BUDGETS:
+            return self.get_response(request)
+
+        stats = QueryStats()
+        with self.count_queries(stats):
+            response = self.get_response(request)
+
+        if settings.DB_STATS_HEADERS:
+            response['X-DB-Queries'] = stats.count
+            response['X-DB-Time'] = f'{stats.duration * 1000:.2f}ms'
+
+        if response.streaming:
+            response.streaming_content = self.count_stream(
+                request, response.streaming_content, stats)
+        else:
+            self.check_budget(request, stats)
+        return response
+
+
+def brotli_sequence(sequence):
+    """Сжимает поток байтов в brotli по мере поступления."""
+    compressor = brotli.Compressor(quality=settings.BROTLI_QUALITY)
+    for item in sequence:
+        data = compressor.process(item)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+    """Сжимает ответы API в br или gzip по заголовку Accept-Encoding.
+
+    Сжимаются ответы с путем, начинающимся с COMPRESSION_PATH_PREFIX,
+    размером от COMPRESSION_MIN_SIZE байт и потоковые ответы. br
+    используется, если установлен пакет brotli и клиент его принимает.
+    """
+
+    compressors = {
+        'br': (
+            lambda content: brotli.compress(
+                content, quality=settings.BROTLI_QUALITY),
+            brotli_sequence,
+        ),
+        'gzip': (compress_string, compress_sequence),
+    }
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    @staticmethod
+    def get_encoding(request):
+        """Предпочтительное из доступных кодирований, принятых клиентом."""
+        accepted = {}
+        for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+            name, _, params = item.partition(';')
+            quality = 1.0
+            params = params.strip()
+            if params.startswith('q='):
+                try:
+                    quality = float(params[2:])
+                except ValueError:
+                    quality = 0.0
+            accepted[name.strip().lower()] = quality
+        for encoding in ('br', 'gzip'):
+            if encoding == 'br' and brotli is None:
+                continue
+            if accepted.get(encoding, accepted.get('*', 0)) > 0:
+                return encoding
+        return None
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            not request.path.startswith(settings.COMPRESSION_PATH_PREFIX)
+            or response.has_header('Content-Encoding')
+            or not response.streaming
+            and len(response.content) < settings.COMPRESSION_MIN_SIZE
+        ):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = self.get_encoding(request)
+        if encoding is None:
+            return response
+        compress, compress_stream = self.compressors[encoding]
+
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                response.streaming_content)
+            del response['Content-Length']
+        else:
+            compressed = compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(response.content))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
@@ -1,22 +1,145 @@
-from rest_framework import serializers
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.response import Response
 
+from food_recipes.catalog import POPULARITY, RECIPES, get_catalog_version
 
-class UserRecipeRelationMixin:
-    """Валидация связи User-Recipe и сериализация в кратком виде."""
 
-    class Meta:
-        fields = ('user', 'recipe')
+class CatalogCacheMixin:
+    """Условные GET-запросы и Cache-Control для справочников.
 
-    def validate(self, data):
-        user = data['user']
-        recipe = data['recipe']
-        if self.Meta.model.objects.filter(user=user, recipe=recipe).exists():
-            raise serializers.ValidationError('Рецепт уже добавлен!')
-        return data
+    ETag и Last-Modified берутся из версии справочника, поэтому ответ 304
+    отдается без обращения к ORM и сериализатору.
+    """
 
-    def to_representation(self, instance):
-        """Возвращаем краткую информацию о рецептах."""
-        recipe = instance.recipe
-        from .serializers import SimpleRecipeSerializer
-        serializer = SimpleRecipeSerializer(recipe, context=self.context)
-        return serializer.data
+    catalog = None
+
+    def get_conditional_response(self, request, view):
+        version = get_catalog_version(self.catalog)
+        etag = f'"{self.catalog}-{version}"'
+        last_modified = version // 10 ** 9
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = view()
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            patch_cache_control(
+                response, public=True,
+                max_age=settings.CATALOG_CACHE_MAX_AGE,
+            )
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            request, lambda: super(CatalogCacheMixin, self).list(
+                request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            request, lambda: super(CatalogCacheMixin, self).retrieve(
+                request, *args, **kwargs)
+        )
+
+
+class AnonymousListCacheMixin:
+    """Кеширует страницы списка рецептов для анонимных пользователей.
+
+    Ключ строится из нормализованных параметров фильтрации и пагинации
+    и версии рецептов, которая меняется при любом изменении рецепта,
+    его ингредиентов, тегов или автора. Страницы с сортировкой по
+    популярности зависят еще и от версии популярности, которая меняется
+    при добавлении в избранное.
+    """
+
+    list_cache_params = (
+        'tags', 'author', 'search', 'ordering', 'page', 'limit', 'pagination',
+        'cursor'
+    )
+    list_cache_prefix = 'recipe_list'
+
+    def get_list_cache_key(self, request):
+        params = request.query_params
+        if not set(params) <= set(self.list_cache_params):
+            return None
+        normalized = '&'.join(
+            f'{name}={",".join(sorted(set(params.getlist(name))))}'
+            for name in self.list_cache_params if name in params
+        )
+        catalogs = [RECIPES]
+        ordering = ','.join(params.getlist('ordering')).split(',')
+        if any(value.lstrip('-') == 'popular' for value in ordering):
+            catalogs.append(POPULARITY)
+        versions = ':'.join(
+            str(get_catalog_version(catalog)) for catalog in catalogs)
+        return (
+            f'{self.list_cache_prefix}:{versions}:'
+            f'{request.scheme}://{request.get_host()}:{normalized}'
+        )
+
+    def count_list_cache(self, result):
+        key = f'{self.list_cache_prefix}:{result}'
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+    def list(self, request, *args, **kwargs):
+        timeout = settings.RECIPE_LIST_CACHE_TIMEOUT
+        key = None
+        if timeout and not request.user.is_authenticated:
+            key = self.get_list_cache_key(request)
+        if key is None:
+            return super().list(request, *args, **kwargs)
+
+        data = cache.get(key)
+        if data is not None:
+            self.count_list_cache('hits')
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        self.count_list_cache('misses')
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, timeout)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class FastReadMixin:
+    """Отдает list и retrieve через fast_serializer_class.
+
+    Включается настройкой RECIPE_FAST_READ. Права на объект при чтении не
+    проверяются, поэтому миксин подходит только для представлений, где
+    безопасные методы доступны для любого объекта.
+    """
+
+    fast_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        if not settings.RECIPE_FAST_READ:
+            return super().list(request, *args, **kwargs)
+        queryset = self.fast_serializer_class.get_values(
+            self.filter_queryset(self.get_queryset()))
+        serializer = self.fast_serializer_class(request)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                serializer.to_representation(page))
+        return Response(serializer.to_representation(queryset))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not settings.RECIPE_FAST_READ:
+            return super().retrieve(request, *args, **kwargs)
+        queryset = self.fast_serializer_class.get_values(
+            self.filter_queryset(self.get_queryset()))
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(
+            queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        serializer = self.fast_serializer_class(request)
+        return Response(serializer.to_representation([row])[0])
@@ -0,0 +1,8 @@
+from rest_framework.negotiation import DefaultContentNegotiation
+
+
+class FileFormatNegotiation(DefaultContentNegotiation):
+    """Не выбирает рендерер по ?format=, этот параметр задает формат файла."""
+
+    def filter_renderers(self, renderers, format):
+        return renderers
@@ -1,7 +1,51 @@
 from django.conf import settings
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CursorPaginator(CursorPagination):
+    """Пагинация по ключу без COUNT(*) и OFFSET."""
+
+    page_size = settings.PAGE_SIZE
+    page_size_query_param = 'limit'
+    ordering = '-pk'
 
 
 class PagePaginator(PageNumberPagination):
+    """Постраничная пагинация с переключением на курсорную.
+
+    Параметр ?pagination=cursor (или уже полученный ?cursor=) включает
+    CursorPaginator с порядком cursor_ordering представления.
+    Параметры из cursor_unsupported_params представления задают другой
+    порядок, поэтому вместе с курсорной пагинацией дают ошибку 400.
+    """
+
     page_size = settings.PAGE_SIZE
     page_size_query_param = 'limit'
+    cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if 'cursor' in params or params.get('pagination') == 'cursor':
+            unsupported = [
+                name for name in getattr(view, 'cursor_unsupported_params', ())
+                if name in params
+            ]
+            if unsupported:
+                raise ValidationError({
+                    name: 'Не поддерживается с курсорной пагинацией!'
+                    for name in unsupported
+                })
+            self.cursor_paginator = CursorPaginator()
+            self.cursor_paginator.ordering = getattr(
+                view, 'cursor_ordering', CursorPaginator.ordering
+            )
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,36 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson; без orjson работает как обычный.
+
+    Компактный вывод в UTF-8 совпадает с JSONRenderer. Отформатированный
+    вывод (indent в Accept или контексте) и ensure_ascii отдаются
+    родительскому классу.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None
+            or self.ensure_ascii or not self.compact
+            or self.get_indent(
+                accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(
+                data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+        return ret.replace(
+            b'\xe2\x80\xa8', b'\\u2028'
+        ).replace(
+            b'\xe2\x80\xa9', b'\\u2029'
+        )
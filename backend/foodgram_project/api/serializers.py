@@ -1,41 +1,83 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from djoser.serializers import UserCreateSerializer
 from djoser.serializers import UserSerializer as DjoserSerializer
 from drf_base64.fields import Base64ImageField
 from rest_framework import serializers
 
+from food_recipes.images import is_stale
 from food_recipes.models import (
     Favourite,
     Ingredient,
     IngredientForRecipe,
     Recipe,
+    ShoppingCartItem,
     ShoppingList,
     Tag,
 )
 from users.models import Subscription
 
-from .mixins import UserRecipeRelationMixin
 
 User = get_user_model()
 
 
+class ImageDerivativesField(serializers.ReadOnlyField):
+    """Ссылки на уменьшенные копии изображения и их WebP-варианты."""
+
+    def __init__(self, image_field, derivatives_field, **kwargs):
+        self.image_field = image_field
+        self.derivatives_field = derivatives_field
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        if is_stale(instance, self.image_field, self.derivatives_field):
+            return {}
+        request = self.context.get('request')
+        urls = {}
+        for name, path in getattr(instance, self.derivatives_field).items():
+            if name == 'source':
+                continue
+            url = default_storage.url(path)
+            urls[name] = request.build_absolute_uri(url) if request else url
+        return urls
+
+
+def get_subscribed_author_ids(request):
+    """Загружает id авторов, на которых подписан пользователь.
+
+    Множество кешируется на объекте запроса, поэтому все сериализаторы
+    одного ответа, включая вложенных авторов рецептов, делают
+    один запрос к подпискам.
+    """
+    author_ids = getattr(request, '_subscribed_author_ids', None)
+    if author_ids is None:
+        author_ids = set(Subscription.objects.filter(
+            user=request.user
+        ).values_list('author_id', flat=True))
+        request._subscribed_author_ids = author_ids
+    return author_ids
+
+
 class UserSerializer(DjoserSerializer):
     """Сериализует пользователя, добавляет статус подписки.."""
 
     is_subscribed = serializers.SerializerMethodField()
+    avatar_variants = ImageDerivativesField('avatar', 'avatar_derivatives')
 
     class Meta:
         model = User
         fields = ('email', 'id', 'username', 'first_name',
-                  'last_name', 'is_subscribed', 'avatar')
+                  'last_name', 'is_subscribed', 'avatar', 'avatar_variants')
 
     def get_is_subscribed(self, obj):
         """Проверка подписки текущего пользователя на автора."""
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return Subscription.objects.filter(
-                user=request.user, author=obj
-            ).exists()
+            return obj.pk in get_subscribed_author_ids(request)
         return False
 
 
@@ -67,69 +109,49 @@ class AvatarSerializer(serializers.ModelSerializer):
 class SimpleRecipeSerializer(serializers.ModelSerializer):
     """Коротко отображает информацию о рецептах."""
 
+    image_variants = ImageDerivativesField('image', 'image_derivatives')
+
     class Meta:
         model = Recipe
         fields = ('id', 'name',
-                  'image', 'cooking_time')
+                  'image', 'image_variants', 'cooking_time')
 
 
 class UserSubscriptionSerializer(UserSerializer):
     """Отображает пользователя, рецепты, лимит."""
 
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.IntegerField(default=0)
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta(UserSerializer.Meta):
         fields = UserSerializer.Meta.fields + ('recipes_count', 'recipes')
 
-    def get_recipes(self, obj):
-        """Получает список рецептов автора с учетом лимита."""
-        request = self.context.get('request')
-        queryset = Recipe.objects.filter(author=obj)
+    @staticmethod
+    def get_recipes_limit(request):
+        """Возвращает положительный лимит рецептов из запроса или None."""
         recipes_limit = request.query_params.get('recipes_limit')
+        if recipes_limit is not None and recipes_limit.isdigit():
+            recipes_limit = int(recipes_limit)
+            if recipes_limit > 0:
+                return recipes_limit
+        return None
 
-        if recipes_limit is not None:
-            if isinstance(recipes_limit, str) and recipes_limit.isdigit():
-                recipes_limit = int(recipes_limit)
-                if recipes_limit > 0:
-                    queryset = queryset[:recipes_limit]
+    def get_recipes(self, obj):
+        """Получает список рецептов автора с учетом лимита."""
+        if hasattr(obj, 'limited_recipes'):
+            queryset = obj.limited_recipes
+        else:
+            request = self.context.get('request')
+            queryset = Recipe.objects.filter(author=obj)
+            recipes_limit = self.get_recipes_limit(request)
+            if recipes_limit is not None:
+                queryset = queryset[:recipes_limit]
 
         return SimpleRecipeSerializer(
             queryset, many=True, context=self.context
         ).data
 
 
-class SubscriptionSerializer(serializers.ModelSerializer):
-    """Отображает подписки."""
-
-    class Meta:
-        model = Subscription
-        fields = ('user', 'author')
-        validators = [
-            serializers.UniqueTogetherValidator(
-                queryset=Subscription.objects.all(),
-                fields=('user', 'author'),
-                message="Вы уже подписаны на этого пользователя!"
-            )
-        ]
-
-    def validate(self, data):
-        user, author = data['user'], data['author']
-
-        if user == author:
-            raise serializers.ValidationError(
-                'Вы не можете подписаться на себя!'
-            )
-
-        return data
-
-    def to_representation(self, instance):
-        """Возвращаем информацию на кого подписались."""
-        author = instance.author
-        serializer = UserSubscriptionSerializer(author, context=self.context)
-        return serializer.data
-
-
 class TagSerializer(serializers.ModelSerializer):
     """Отображает теги."""
 
@@ -171,32 +193,36 @@ class RecipeSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     image = Base64ImageField()
+    image_variants = ImageDerivativesField('image', 'image_derivatives')
 
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients',
                   'is_favorited', 'is_in_shopping_cart',
-                  'name', 'image', 'text', 'cooking_time')
+                  'name', 'image', 'image_variants', 'text', 'cooking_time')
 
-    def get_is_favorited(self, obj):
+    def _get_user_relation(self, obj, model, annotation):
+        """Берет флаг из аннотации queryset, иначе делает запрос."""
         user = self.context['request'].user
-        if user.is_authenticated:
-            return Favourite.objects.filter(user=user, recipe=obj).exists()
-        return False
+        if not user.is_authenticated:
+            return False
+        if hasattr(obj, annotation):
+            return getattr(obj, annotation)
+        return model.objects.filter(user=user, recipe=obj).exists()
+
+    def get_is_favorited(self, obj):
+        return self._get_user_relation(obj, Favourite, 'is_favorited')
 
     def get_is_in_shopping_cart(self, obj):
-        user = self.context['request'].user
-        if user.is_authenticated:
-            return ShoppingList.objects.filter(user=user, recipe=obj).exists()
-        return False
+        return self._get_user_relation(
+            obj, ShoppingList, 'is_in_shopping_cart'
+        )
 
 
 class IngredientForRecipeCreateSerializer(serializers.ModelSerializer):
     """Добавляет ингредиенты при создании, обновлении рецепта."""
 
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(), source='ingredient'
-    )
+    id = serializers.IntegerField(source='ingredient')
 
     class Meta:
         model = IngredientForRecipe
@@ -206,8 +232,8 @@ class IngredientForRecipeCreateSerializer(serializers.ModelSerializer):
 class RecipeСreateUpdateSerializer(serializers.ModelSerializer):
     """Создает и обновляет рецепты."""
 
-    tags = serializers.PrimaryKeyRelatedField(
-        many=True, queryset=Tag.objects.all(), allow_empty=False
+    tags = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False
     )
     author = UserSerializer(read_only=True,)
     ingredients = IngredientForRecipeCreateSerializer(
@@ -221,7 +247,12 @@ class RecipeСreateUpdateSerializer(serializers.ModelSerializer):
                   'name', 'text', 'cooking_time', 'author')
 
     def validate(self, data):
-        """Проверяет уникальность тегов и ингредиентов."""
+        """Проверяет уникальность и существование тегов и ингредиентов.
+
+        Теги и ингредиенты загружаются одним запросом каждые. Ошибки о
+        несуществующих id - как у PrimaryKeyRelatedField: по сообщению на
+        каждый тег и по словарю на каждый ингредиент.
+        """
         if not data.get('tags'):
             raise serializers.ValidationError('Укажите теги!')
         if len(set(data['tags'])) != len(data['tags']):
@@ -229,9 +260,33 @@ class RecipeСreateUpdateSerializer(serializers.ModelSerializer):
 
         if not data.get('ingredients'):
             raise serializers.ValidationError('Укажите ингредиенты!')
-        ingredient_ids = [i['ingredient'].id for i in data['ingredients']]
+        ingredient_ids = [i['ingredient'] for i in data['ingredients']]
         if len(set(ingredient_ids)) != len(ingredient_ids):
             raise serializers.ValidationError('Ингредиенты не уникальны!')
+
+        tags = Tag.objects.in_bulk(data['tags'])
+        ingredients = Ingredient.objects.in_bulk(ingredient_ids)
+        does_not_exist = (
+            serializers.PrimaryKeyRelatedField.default_error_messages
+        )['does_not_exist']
+        errors = {}
+        missing_tags = [pk for pk in data['tags'] if pk not in tags]
+        if missing_tags:
+            errors['tags'] = [
+                does_not_exist.format(pk_value=pk) for pk in missing_tags
+            ]
+        if any(pk not in ingredients for pk in ingredient_ids):
+            errors['ingredients'] = [
+                {} if pk in ingredients
+                else {'id': [does_not_exist.format(pk_value=pk)]}
+                for pk in ingredient_ids
+            ]
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        data['tags'] = [tags[pk] for pk in data['tags']]
+        for ingredient in data['ingredients']:
+            ingredient['ingredient'] = ingredients[ingredient['ingredient']]
         return data
 
     def validate_image(self, image):
@@ -255,44 +310,90 @@ class RecipeСreateUpdateSerializer(serializers.ModelSerializer):
             ingredient_for_recipes
         )
 
+    @staticmethod
+    def update_ingredients(recipe, ingredients):
+        """Меняет только изменившиеся ингредиенты рецепта.
+
+        Возвращает прежние количества ингредиентов по их id.
+        """
+        existing = {
+            item.ingredient_id: item
+            for item in recipe.recipe_ingredients.all()
+        }
+        amounts = {
+            ingredient['ingredient'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+        old_amounts = {
+            ingredient_id: item.amount
+            for ingredient_id, item in existing.items()
+        }
+        removed = existing.keys() - amounts.keys()
+        if removed:
+            recipe.recipe_ingredients.filter(
+                ingredient_id__in=removed
+            ).delete()
+        changed = [
+            item for ingredient_id, item in existing.items()
+            if amounts.get(ingredient_id, item.amount) != item.amount
+        ]
+        for item in changed:
+            item.amount = amounts[item.ingredient_id]
+        if changed:
+            IngredientForRecipe.objects.bulk_update(changed, ('amount',))
+        added = [
+            IngredientForRecipe(
+                recipe=recipe,
+                ingredient_id=ingredient_id,
+                amount=amount,
+            )
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in existing
+        ]
+        if added:
+            IngredientForRecipe.objects.bulk_create(added)
+        return old_amounts
+
     def create(self, validated_data):
         """Создает рецепт."""
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
         current_user = self.context['request'].user
-        recipe = Recipe.objects.create(
-            author=current_user,
-            **validated_data
-        )
-        recipe.tags.set(tags)
-        self.add_ingredients(recipe, ingredients)
+        with transaction.atomic():
+            recipe = Recipe.objects.create(
+                author=current_user,
+                **validated_data
+            )
+            recipe.tags.set(tags)
+            self.add_ingredients(recipe, ingredients)
         return recipe
 
     def update(self, instance, validated_data):
         """Обновляет рецепт."""
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
-        instance.ingredients.clear()
-        instance.tags.set(tags)
-        self.add_ingredients(instance, ingredients)
-        return super().update(instance, validated_data)
+        with transaction.atomic():
+            old_amounts = self.update_ingredients(instance, ingredients)
+            instance.tags.set(tags)
+            ShoppingCartItem.objects.update_recipe(instance, old_amounts)
+            return super().update(instance, validated_data)
 
     def to_representation(self, instance):
         """Преобразовывает объект рецепта в представление."""
+        prefetch_related_objects(
+            [instance], 'recipe_ingredients__ingredient', 'tags'
+        )
         return RecipeSerializer(instance, context=self.context).data
 
 
-class FavoriteSerializer(UserRecipeRelationMixin,
-                         serializers.ModelSerializer):
-    """Добавляет рецепты в избранное."""
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список id рецептов для массового добавления/удаления."""
 
-    class Meta(UserRecipeRelationMixin.Meta):
-        model = Favourite
-
-
-class ShoppingListSerializer(UserRecipeRelationMixin,
-                             serializers.ModelSerializer):
-    """Добавляет рецепты в корзину покупок."""
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.RECIPES_BATCH_MAX_SIZE,
+    )
 
-    class Meta(UserRecipeRelationMixin.Meta):
-        model = ShoppingList
+    def validate_recipes(self, value):
+        return list(dict.fromkeys(value))
@@ -0,0 +1,62 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from food_recipes.catalog import RECIPES, get_catalog_version
+
+User = get_user_model()
+
+
+@pytest.fixture
+def version(foodgram):
+    """Возвращает, сменилась ли версия списка рецептов с прошлого вызова."""
+    versions = [get_catalog_version(RECIPES)]
+
+    def changed():
+        versions.append(get_catalog_version(RECIPES))
+        return versions[-1] != versions[-2]
+
+    return changed
+
+
+def test_token_login_keeps_recipe_cache(foodgram, anon_client, version):
+    response = anon_client.post(reverse('api:login'), {
+        'email': foodgram.user.email, 'password': 'Password-123'})
+    assert response.status_code == 200
+    assert User.objects.get(pk=foodgram.user.pk).last_login is not None
+    assert not version()
+
+
+def test_password_change_keeps_recipe_cache(user_client, version):
+    response = user_client.post(reverse('api:users-set-password'), {
+        'current_password': 'Password-123',
+        'new_password': 'Password-456',
+    })
+    assert response.status_code == 204
+    assert not version()
+
+
+def test_unchanged_author_save_keeps_recipe_cache(foodgram, version):
+    user = User.objects.get(pk=foodgram.user.pk)
+    user.is_staff = True
+    user.save()
+    assert not version()
+
+
+def test_author_name_change_resets_recipe_cache(foodgram, version):
+    user = User.objects.get(pk=foodgram.user.pk)
+    user.first_name = 'Новое имя'
+    user.save()
+    assert version()
+    user.save(update_fields=('last_login',))
+    assert not version()
+
+
+def test_avatar_change_resets_recipe_cache(user_client, version, png):
+    url = reverse('api:users-avatar')
+    response = user_client.put(url, {'avatar': png}, format='json')
+    assert response.status_code == 200
+    assert version()
+    response = user_client.delete(url)
+    assert response.status_code == 204
+    assert version()
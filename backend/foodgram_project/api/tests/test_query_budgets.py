@@ -0,0 +1,210 @@
+import logging
+
+import pytest
+from django.urls import reverse
+
+PAGE_SIZES = (2, 10)
+
+READ_ACTIONS = (
+    ('api:recipes-list', lambda data: {}),
+    ('api:recipes-detail', lambda data: {'pk': data.recipes[0].pk}),
+    ('api:recipes-get-link', lambda data: {'pk': data.recipes[0].pk}),
+    ('api:users-list', lambda data: {}),
+    ('api:users-detail', lambda data: {'id': data.users[1].pk}),
+    ('api:tags-list', lambda data: {}),
+    ('api:tags-detail', lambda data: {'pk': data.tags[0].pk}),
+    ('api:ingredients-list', lambda data: {}),
+    ('api:ingredients-detail', lambda data: {'pk': data.ingredients[0].pk}),
+)
+
+PAGINATED_URLS = (
+    '/api/recipes/?',
+    '/api/recipes/?tags=tag0&tags=tag1&',
+    '/api/recipes/?pagination=cursor&',
+    '/api/users/?',
+    '/api/users/?pagination=cursor&',
+)
+
+USER_PAGINATED_URLS = (
+    '/api/recipes/?is_favorited=1&',
+    '/api/recipes/?is_in_shopping_cart=1&',
+    '/api/users/subscriptions/?',
+    '/api/users/subscriptions/?recipes_limit=1&',
+)
+
+
+@pytest.mark.parametrize('client_name', ('anon_client', 'user_client'))
+@pytest.mark.parametrize('view_name, get_kwargs', READ_ACTIONS)
+def test_read_actions_fit_budget(
+    request, foodgram, assert_query_budget, client_name, view_name,
+    get_kwargs,
+):
+    client = request.getfixturevalue(client_name)
+    response, _ = assert_query_budget(
+        client, 'GET', reverse(view_name, kwargs=get_kwargs(foodgram)))
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize('view_name', (
+    'api:users-me',
+    'api:users-subscriptions',
+    'api:recipes-download_shopping_cart',
+))
+def test_user_read_actions_fit_budget(
+    user_client, assert_query_budget, view_name,
+):
+    response, _ = assert_query_budget(user_client, 'GET', reverse(view_name))
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize('file_format', ('txt', 'csv', 'json'))
+def test_download_shopping_cart_counts_streamed_queries(
+    user_client, assert_query_budget, file_format,
+):
+    response, queries = assert_query_budget(
+        user_client, 'GET',
+        f'{reverse("api:recipes-download_shopping_cart")}'
+        f'?format={file_format}',
+    )
+    assert response.status_code == 200
+    assert int(response['X-DB-Queries']) < queries
+    assert 'Ингредиент 0'.encode() in b''.join(response.streaming_content)
+
+
+@pytest.mark.parametrize('client_name, url', [
+    *(('anon_client', url) for url in PAGINATED_URLS),
+    *(('user_client', url) for url in PAGINATED_URLS + USER_PAGINATED_URLS),
+])
+def test_list_queries_do_not_grow_with_page_size(
+    request, foodgram, assert_query_budget, client_name, url,
+):
+    client = request.getfixturevalue(client_name)
+    counts = []
+    for limit in PAGE_SIZES:
+        response, queries = assert_query_budget(
+            client, 'GET', f'{url}limit={limit}')
+        assert response.status_code == 200
+        results = response.data['results']
+        assert len(results) == limit
+        counts.append(queries)
+    assert counts[0] == counts[1]
+
+
+def test_create_recipe_fits_budget(
+    foodgram, user_client, assert_query_budget, recipe_payload,
+):
+    response, _ = assert_query_budget(
+        user_client, 'POST', reverse('api:recipes-list'),
+        data=recipe_payload(), format='json',
+    )
+    assert response.status_code == 201
+
+
+def test_patch_recipe_fits_budget(
+    foodgram, user_client, assert_query_budget, recipe_payload,
+):
+    response, _ = assert_query_budget(
+        user_client, 'PATCH',
+        reverse('api:recipes-detail', args=(foodgram.recipes[0].pk,)),
+        data=recipe_payload(offset=1), format='json',
+    )
+    assert response.status_code == 200
+
+
+def test_delete_recipe_fits_budget(
+    foodgram, user_client, assert_query_budget,
+):
+    response, _ = assert_query_budget(
+        user_client, 'DELETE',
+        reverse('api:recipes-detail', args=(foodgram.recipes[0].pk,)),
+    )
+    assert response.status_code == 204
+
+
+@pytest.mark.parametrize('action', ('favorite', 'shopping_cart'))
+def test_recipe_relation_actions_fit_budget(
+    foodgram, user_client, assert_query_budget, action,
+):
+    url = reverse(f'api:recipes-{action}', args=(foodgram.recipes[-1].pk,))
+    response, _ = assert_query_budget(user_client, 'POST', url)
+    assert response.status_code == 201
+    response, _ = assert_query_budget(user_client, 'DELETE', url)
+    assert response.status_code == 204
+
+
+@pytest.mark.parametrize('action', ('favorite_batch', 'shopping_cart_batch'))
+def test_recipe_batch_actions_fit_budget(
+    foodgram, user_client, assert_query_budget, action,
+):
+    url = reverse(f'api:recipes-{action}')
+    data = {'recipes': [recipe.pk for recipe in foodgram.recipes[5:15]]}
+    response, _ = assert_query_budget(
+        user_client, 'POST', url, data=data, format='json')
+    assert response.status_code == 200
+    response, _ = assert_query_budget(
+        user_client, 'DELETE', url, data=data, format='json')
+    assert response.status_code == 200
+    response, _ = assert_query_budget(user_client, 'DELETE', url)
+    assert response.status_code == 200
+
+
+def test_subscribe_fits_budget(foodgram, user_client, assert_query_budget):
+    url = reverse('api:users-subscribe', args=(foodgram.users[1].pk,))
+    response, _ = assert_query_budget(user_client, 'DELETE', url)
+    assert response.status_code == 204
+    response, _ = assert_query_budget(user_client, 'POST', url)
+    assert response.status_code == 201
+
+
+def test_avatar_fits_budget(user_client, assert_query_budget, png):
+    url = reverse('api:users-avatar')
+    response, _ = assert_query_budget(
+        user_client, 'PUT', url, data={'avatar': png}, format='json')
+    assert response.status_code == 200
+    response, _ = assert_query_budget(user_client, 'DELETE', url)
+    assert response.status_code == 204
+
+
+def test_register_user_fits_budget(
+    transactional_db, anon_client, assert_query_budget,
+):
+    response, _ = assert_query_budget(
+        anon_client, 'POST', reverse('api:users-list'),
+        data={
+            'email': 'new@foodgram.ru',
+            'username': 'new_user',
+            'first_name': 'Имя',
+            'last_name': 'Фамилия',
+            'password': 'Password-123',
+        },
+        format='json',
+    )
+    assert response.status_code == 201
+
+
+def test_stats_headers_match_queries(foodgram, user_client,
+                                     assert_query_budget):
+    response, queries = assert_query_budget(
+        user_client, 'GET', reverse('api:recipes-list'))
+    assert int(response['X-DB-Queries']) == queries
+    assert response['X-DB-Time'].endswith('ms')
+
+
+def test_budget_overrun_is_logged(settings, foodgram, user_client, caplog):
+    settings.QUERY_BUDGETS = {'api:recipes-list': {'GET': 1}}
+    with caplog.at_level(logging.WARNING, logger='api.middleware'):
+        user_client.get(reverse('api:recipes-list'))
+    assert 'api:recipes-list' in caplog.text
+
+
+def test_streamed_budget_overrun_is_logged(settings, foodgram, user_client,
+                                           caplog):
+    settings.QUERY_BUDGETS = {
+        'api:recipes-download_shopping_cart': {'GET': 1}}
+    with caplog.at_level(logging.WARNING, logger='api.middleware'):
+        response = user_client.get(
+            reverse('api:recipes-download_shopping_cart'))
+        assert int(response['X-DB-Queries']) <= 1
+        assert not caplog.text
+        b''.join(response.streaming_content)
+    assert 'api:recipes-download_shopping_cart' in caplog.text
@@ -0,0 +1,112 @@
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from food_recipes.models import IngredientForRecipe, Recipe
+
+INGREDIENTS_TABLE = IngredientForRecipe._meta.db_table
+TAGS_TABLE = Recipe.tags.through._meta.db_table
+
+
+def get_writes(context, table):
+    """Виды запросов на запись в table: INSERT, UPDATE или DELETE."""
+    writes = []
+    for query in context.captured_queries:
+        statement = query['sql'].split(None, 1)[0].upper()
+        if statement in ('INSERT', 'UPDATE', 'DELETE') and (
+            f'"{table}"' in query['sql'].split(' WHERE ')[0]
+        ):
+            writes.append(statement)
+    return sorted(writes)
+
+
+def edit(recipe, amounts=None, tags=None):
+    """Тело PATCH с текущим составом рецепта и изменениями поверх."""
+    current = recipe.get_ingredient_amounts()
+    if amounts is not None:
+        current.update(amounts)
+    return {
+        'ingredients': [
+            {'id': ingredient_id, 'amount': amount}
+            for ingredient_id, amount in current.items() if amount
+        ],
+        'tags': tags or list(recipe.tags.values_list('pk', flat=True)),
+    }
+
+
+@pytest.fixture
+def recipe(foodgram):
+    """Рецепт первого пользователя, которого нет ни в чьей корзине."""
+    return foodgram.recipes[12]
+
+
+@pytest.fixture
+def patch_recipe(user_client, django_assert_num_queries):
+    """Отправляет PATCH и проверяет точное число запросов.
+
+    Оно одинаково в SQLite и PostgreSQL: BEGIN в SQLite соответствует
+    обновлению поискового вектора в PostgreSQL. Неизменный рецепт все
+    равно читается для проверки, сохраняется и сериализуется.
+    """
+
+    def patch(recipe, data, queries):
+        with django_assert_num_queries(queries) as context:
+            response = user_client.patch(
+                reverse('api:recipes-detail', args=(recipe.pk,)),
+                data, format='json',
+            )
+        assert response.status_code == 200, response.data
+        return context
+
+    return patch
+
+
+def test_unchanged_recipe_writes_nothing(recipe, patch_recipe):
+    context = patch_recipe(recipe, edit(recipe), 17)
+    assert get_writes(context, INGREDIENTS_TABLE) == []
+    assert get_writes(context, TAGS_TABLE) == []
+
+
+def test_change_amount_updates_one_row(recipe, patch_recipe):
+    ingredient_id = next(iter(recipe.get_ingredient_amounts()))
+    context = patch_recipe(recipe, edit(recipe, {ingredient_id: 500}), 18)
+    assert get_writes(context, INGREDIENTS_TABLE) == ['UPDATE']
+    assert get_writes(context, TAGS_TABLE) == []
+    assert recipe.get_ingredient_amounts()[ingredient_id] == 500
+
+
+def test_add_ingredient_inserts_one_row(foodgram, recipe, patch_recipe):
+    amounts = recipe.get_ingredient_amounts()
+    new = next(
+        ingredient for ingredient in foodgram.ingredients
+        if ingredient.pk not in amounts
+    )
+    context = patch_recipe(recipe, edit(recipe, {new.pk: 7}), 18)
+    assert get_writes(context, INGREDIENTS_TABLE) == ['INSERT']
+    assert recipe.get_ingredient_amounts() == {**amounts, new.pk: 7}
+
+
+def test_remove_ingredient_deletes_one_row(recipe, patch_recipe):
+    amounts = recipe.get_ingredient_amounts()
+    removed = next(iter(amounts))
+    context = patch_recipe(recipe, edit(recipe, {removed: 0}), 19)
+    assert get_writes(context, INGREDIENTS_TABLE) == ['DELETE']
+    del amounts[removed]
+    assert recipe.get_ingredient_amounts() == amounts
+
+
+def test_change_tags_touches_only_tags(foodgram, recipe, patch_recipe):
+    tags = [foodgram.tags[-1].pk]
+    context = patch_recipe(recipe, edit(recipe, tags=tags), 20)
+    assert get_writes(context, INGREDIENTS_TABLE) == []
+    assert 'INSERT' in get_writes(context, TAGS_TABLE)
+    assert list(recipe.tags.values_list('pk', flat=True)) == tags
+
+
+def test_edit_in_cart_keeps_totals(foodgram, patch_recipe):
+    recipe = foodgram.recipes[0]
+    amounts = recipe.get_ingredient_amounts()
+    ingredient_id, removed = list(amounts)[:2]
+    patch_recipe(
+        recipe, edit(recipe, {ingredient_id: 300, removed: 0}), 25)
+    call_command('rebuild_shopping_cart', '--verify')
@@ -0,0 +1,199 @@
+import pytest
+from django.urls import reverse
+
+from food_recipes.models import Favourite, ShoppingList
+
+# Токен, COUNT(*), рецепты с флагами, ингредиенты рецептов, сами
+# ингредиенты, теги, подписки пользователя.
+LIST_QUERIES = 7
+# Токен, рецепт с флагами, ингредиенты рецепта, сами ингредиенты, теги,
+# подписки пользователя.
+DETAIL_QUERIES = 6
+# В SQLite транзакция открывается запросом BEGIN, в PostgreSQL вместо
+# него после сохранения рецепта обновляется поисковый вектор, поэтому
+# число запросов на запись в обеих базах одинаковое.
+CREATE_QUERIES = 18
+PATCH_QUERIES = 29
+
+
+def get_flags(user, recipe_ids):
+    favorites = set(Favourite.objects.filter(
+        user=user, recipe_id__in=recipe_ids
+    ).values_list('recipe_id', flat=True))
+    cart = set(ShoppingList.objects.filter(
+        user=user, recipe_id__in=recipe_ids
+    ).values_list('recipe_id', flat=True))
+    return {
+        pk: {
+            'is_favorited': pk in favorites,
+            'is_in_shopping_cart': pk in cart,
+        }
+        for pk in recipe_ids
+    }
+
+
+@pytest.mark.parametrize('limit, page', ((2, 8), (9, 2)))
+def test_list_flags_do_not_add_queries(
+    foodgram, user_client, django_assert_num_queries, limit, page,
+):
+    with django_assert_num_queries(LIST_QUERIES):
+        response = user_client.get(
+            reverse('api:recipes-list'), {'limit': limit, 'page': page})
+    results = response.data['results']
+    assert len(results) == limit
+    flags = get_flags(foodgram.user, [recipe['id'] for recipe in results])
+    for recipe in results:
+        assert {
+            'is_favorited': recipe['is_favorited'],
+            'is_in_shopping_cart': recipe['is_in_shopping_cart'],
+        } == flags[recipe['id']]
+    assert any(flag['is_favorited'] for flag in flags.values())
+
+
+def test_list_for_anonymous_has_no_flags_queries(
+    foodgram, anon_client, django_assert_num_queries,
+):
+    with django_assert_num_queries(LIST_QUERIES - 2):
+        response = anon_client.get(reverse('api:recipes-list'))
+    assert not any(
+        recipe['is_favorited'] or recipe['is_in_shopping_cart']
+        for recipe in response.data['results']
+    )
+
+
+@pytest.mark.parametrize('index', (0, -1))
+def test_detail_flags(
+    foodgram, user_client, django_assert_num_queries, index,
+):
+    recipe = foodgram.recipes[index]
+    with django_assert_num_queries(DETAIL_QUERIES):
+        response = user_client.get(
+            reverse('api:recipes-detail', args=(recipe.pk,)))
+    assert response.status_code == 200
+    assert {
+        'is_favorited': response.data['is_favorited'],
+        'is_in_shopping_cart': response.data['is_in_shopping_cart'],
+    } == get_flags(foodgram.user, [recipe.pk])[recipe.pk]
+
+
+def test_create_response_flags(
+    foodgram, user_client, django_assert_num_queries, recipe_payload,
+):
+    with django_assert_num_queries(CREATE_QUERIES):
+        response = user_client.post(
+            reverse('api:recipes-list'),
+            recipe_payload(), format='json',
+        )
+    assert response.status_code == 201
+    assert response.data['is_favorited'] is False
+    assert response.data['is_in_shopping_cart'] is False
+
+
+def test_patch_response_flags(
+    foodgram, user_client, django_assert_num_queries, recipe_payload,
+):
+    recipe = foodgram.recipes[0]
+    with django_assert_num_queries(PATCH_QUERIES):
+        response = user_client.patch(
+            reverse('api:recipes-detail', args=(recipe.pk,)),
+            recipe_payload(offset=1), format='json',
+        )
+    assert response.status_code == 200
+    assert response.data['is_favorited'] is True
+    assert response.data['is_in_shopping_cart'] is True
+
+
+def get_ids(client, params):
+    response = client.get(reverse('api:recipes-list'), params)
+    assert response.status_code == 200
+    return [recipe['id'] for recipe in response.data['results']]
+
+
+def test_popular_ordering_is_descending_with_tiebreaker(
+    foodgram, anon_client,
+):
+    # В избранном у первого пользователя первые десять рецептов.
+    popular = foodgram.recipes[9::-1]
+    expected = [recipe.pk for recipe in popular + foodgram.recipes[:9:-1]]
+    assert get_ids(anon_client, {'ordering': 'popular', 'limit': 24}) == (
+        expected)
+    assert get_ids(anon_client, {'ordering': '-popular', 'limit': 24}) == (
+        expected[::-1])
+
+
+def test_favorite_refreshes_cached_popular_page(
+    foodgram, anon_client, user_client,
+):
+    params = {'ordering': 'popular', 'limit': 1}
+    assert get_ids(anon_client, params) == [foodgram.recipes[9].pk]
+    recipe = foodgram.recipes[-1]
+    response = user_client.post(
+        reverse('api:recipes-favorite', args=(recipe.pk,)))
+    assert response.status_code == 201
+    assert get_ids(anon_client, params) == [recipe.pk]
+    user_client.delete(reverse('api:recipes-favorite', args=(recipe.pk,)))
+    assert get_ids(anon_client, params) == [foodgram.recipes[9].pk]
+
+
+@pytest.mark.parametrize('params', (
+    {'pagination': 'cursor', 'ordering': 'popular'},
+    {'pagination': 'cursor', 'search': 'Рецепт'},
+    {'cursor': 'cD0x', 'ordering': '-popular'},
+))
+def test_cursor_pagination_rejects_other_orderings(
+    foodgram, anon_client, params,
+):
+    response = anon_client.get(reverse('api:recipes-list'), params)
+    assert response.status_code == 400
+    assert set(response.data) == set(params) - {'pagination', 'cursor'}
+
+
+def test_cursor_pagination_keeps_id_ordering(foodgram, anon_client):
+    ids = get_ids(anon_client, {'pagination': 'cursor', 'limit': 5})
+    assert ids == [recipe.pk for recipe in foodgram.recipes[:-6:-1]]
+
+
+def test_favorite_keeps_other_cached_pages(foodgram, anon_client,
+                                           user_client):
+    url = reverse('api:recipes-list')
+    assert anon_client.get(url)['X-Cache'] == 'MISS'
+    user_client.post(
+        reverse('api:recipes-favorite', args=(foodgram.recipes[-1].pk,)))
+    assert anon_client.get(url)['X-Cache'] == 'HIT'
+    assert anon_client.get(url, {'ordering': 'id'})['X-Cache'] == 'MISS'
+    user_client.delete(
+        reverse('api:recipes-favorite', args=(foodgram.recipes[-1].pk,)))
+    assert anon_client.get(url, {'ordering': 'id'})['X-Cache'] == 'HIT'
+
+
+def test_unknown_ids_give_field_errors(foodgram, user_client, recipe_payload):
+    payload = recipe_payload()
+    payload['tags'] = [foodgram.tags[0].pk, 998, 999]
+    payload['ingredients'][1]['id'] = 997
+    response = user_client.post(
+        reverse('api:recipes-list'), payload, format='json')
+    assert response.status_code == 400
+    assert response.data == {
+        'tags': [
+            f'Недопустимый первичный ключ "{pk}" - объект не существует.'
+            for pk in (998, 999)
+        ],
+        'ingredients': [
+            {},
+            {'id': [
+                'Недопустимый первичный ключ "997" - объект не существует.'
+            ]},
+            {},
+            {},
+        ],
+    }
+
+
+def test_short_link_stops_redirecting_after_delete(foodgram, anon_client):
+    recipe = foodgram.recipes[-1]
+    url = reverse('api:redirect-to-recipe', args=(recipe.get_short_id(),))
+    response = anon_client.get(url)
+    assert response.status_code == 302
+    assert response['Location'] == recipe.get_absolute_url()
+    recipe.delete()
+    assert anon_client.get(url).status_code == 404
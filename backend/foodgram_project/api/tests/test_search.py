@@ -0,0 +1,66 @@
+import pytest
+from django.db import connection
+from django.urls import reverse
+
+from food_recipes.models import Recipe
+
+postgresql_only = pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='Полнотекстовый поиск работает только в PostgreSQL',
+)
+
+
+@pytest.fixture
+def searchable(foodgram):
+    """Рецепты, где искомое слово есть в названии или только в описании."""
+    author = foodgram.users[1]
+
+    def create(name, text):
+        return Recipe.objects.create(
+            author=author, name=name, text=text, cooking_time=10,
+            image='food_recipes/recipe.png',
+        )
+
+    return {
+        'in_text': create('Суп', 'Свекольный борщ без мяса'),
+        'in_name': create('Борщ', 'Классический рецепт'),
+        'in_both': create('Борщ украинский', 'Настоящий борщ с пампушками'),
+    }
+
+
+def search(client, value):
+    response = client.get(
+        reverse('api:recipes-list'), {'search': value, 'limit': 50})
+    assert response.status_code == 200
+    return [recipe['id'] for recipe in response.data['results']]
+
+
+@postgresql_only
+def test_search_orders_by_rank(searchable, anon_client):
+    assert search(anon_client, 'борщ') == [
+        searchable['in_both'].pk,
+        searchable['in_name'].pk,
+        searchable['in_text'].pk,
+    ]
+
+
+@postgresql_only
+def test_search_matches_word_forms(searchable, anon_client):
+    assert set(search(anon_client, 'борщи')) == {
+        recipe.pk for recipe in searchable.values()}
+    assert search(anon_client, 'пампушка') == [searchable['in_both'].pk]
+
+
+@pytest.mark.skipif(
+    connection.vendor == 'postgresql',
+    reason='Запасной поиск используется вне PostgreSQL',
+)
+def test_search_falls_back_to_icontains(searchable, anon_client):
+    # SQLite не различает регистр только для латиницы.
+    assert search(anon_client, 'орщ') == [
+        searchable['in_both'].pk,
+        searchable['in_name'].pk,
+        searchable['in_text'].pk,
+    ]
+    assert search(anon_client, 'пампушк') == [searchable['in_both'].pk]
+    assert search(anon_client, 'борщи') == []
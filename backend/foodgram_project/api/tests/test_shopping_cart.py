@@ -0,0 +1,34 @@
+from collections import defaultdict
+
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from food_recipes.models import IngredientForRecipe
+
+
+def download(client, file_format='txt'):
+    response = client.get(
+        reverse('api:recipes-download_shopping_cart'), {'format': file_format})
+    assert response.status_code == 200
+    return b''.join(response.streaming_content).decode()
+
+
+def test_txt_matches_previous_format(foodgram, user_client):
+    totals = defaultdict(int)
+    for row in IngredientForRecipe.objects.filter(
+        recipe__in=foodgram.recipes[:10]
+    ).select_related('ingredient'):
+        ingredient = row.ingredient
+        totals[ingredient.name, ingredient.measurement_unit] += row.amount
+    assert download(user_client) == '\n'.join(
+        f'{name} - {amount} {unit}'
+        for (name, unit), amount in sorted(totals.items())
+    )
+
+
+def test_empty_cart_gives_empty_files(foodgram):
+    client = APIClient()
+    client.force_authenticate(foodgram.users[1])
+    assert download(client) == ''
+    assert download(client, 'csv') == 'name,amount,measurement_unit\r\n'
+    assert download(client, 'json') == '[]'
@@ -1,34 +1,45 @@
-import io
+import csv
+import json
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Sum
-from django.http import HttpResponse
+from django.db.models import Exists, OuterRef, Prefetch, Subquery
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet as DjoserUserViewSet
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
+from food_recipes.catalog import INGREDIENTS, TAGS, ingredient_index
 from food_recipes.models import (
     Favourite,
     Ingredient,
     Recipe,
+    ShoppingCartItem,
     ShoppingList,
     Tag)
+from food_recipes.short_ids import decode_short_id
 from users.models import Subscription
 
+from .fast_serializers import RecipeFastSerializer
 from .filters import IngredientFilter, RecipeFilter
+from .mixins import (
+    AnonymousListCacheMixin,
+    CatalogCacheMixin,
+    FastReadMixin,
+)
+from .negotiation import FileFormatNegotiation
 from .pagination import PagePaginator
 from .permissions import IsOwnerOrReadOnly
 from .serializers import (
     AvatarSerializer,
-    FavoriteSerializer,
     IngredientSerializer,
+    RecipeIdsSerializer,
     RecipeСreateUpdateSerializer,
-    ShoppingListSerializer,
-    SubscriptionSerializer,
+    SimpleRecipeSerializer,
     TagSerializer,
     UserSerializer,
     UserSubscriptionSerializer,
@@ -37,6 +48,13 @@ from .serializers import (
 User = get_user_model()
 
 
+class Echo:
+    """Буфер для csv.writer, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
 class UserViewSet(DjoserUserViewSet):
     """Отображение информации о пользователе."""
 
@@ -44,6 +62,8 @@ class UserViewSet(DjoserUserViewSet):
     serializer_class = UserSerializer
     permission_classes = (permissions.AllowAny,)
     pagination_class = PagePaginator
+    cursor_ordering = 'username'
+    lookup_value_regex = r'\d+'
 
     @action(
         detail=False,
@@ -53,7 +73,7 @@ class UserViewSet(DjoserUserViewSet):
     def me(self, request):
         """Отражение текущего пользователя."""
         user = request.user
-        serializer = UserSerializer(user)
+        serializer = UserSerializer(user, context={'request': request})
         return Response(serializer.data)
 
     @action(
@@ -81,6 +101,18 @@ class UserViewSet(DjoserUserViewSet):
 
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
+    @staticmethod
+    def _limited_recipes(recipes_limit):
+        """Первые recipes_limit рецептов каждого автора одним запросом."""
+        queryset = Recipe.objects.order_by('-pk')
+        if recipes_limit is None:
+            return queryset
+        return queryset.filter(pk__in=Subquery(
+            Recipe.objects.filter(
+                author=OuterRef('author')
+            ).order_by('-pk').values('pk')[:recipes_limit]
+        ))
+
     @action(
         detail=False,
         methods=('GET',),
@@ -92,7 +124,14 @@ class UserViewSet(DjoserUserViewSet):
         """Получение списка подписок текущего пользователя."""
         queryset = User.objects.filter(
             subscribers__user=request.user
-        ).annotate(recipes_count=Count('recipes')).order_by('username')
+        ).order_by('username')
+        queryset = queryset.prefetch_related(Prefetch(
+            'recipes',
+            queryset=self._limited_recipes(
+                UserSubscriptionSerializer.get_recipes_limit(request)
+            ),
+            to_attr='limited_recipes',
+        ))
         page = self.paginate_queryset(queryset)
         serializer = UserSubscriptionSerializer(
             page, many=True, context={'request': request})
@@ -106,44 +145,52 @@ class UserViewSet(DjoserUserViewSet):
         permission_classes=[permissions.IsAuthenticated],
     )
     def subscribe(self, request, id=None):
-        """Создание и удаление подписки."""
+        """Создание и удаление подписки.
+
+        Подписка добавляется или удаляется одним запросом, а причина
+        неудачи выясняется уже после него.
+        """
         user = request.user
+        author_id = int(id)
 
         if request.method == 'POST':
-            author = get_object_or_404(User, pk=id)
-            data = {'user': user.pk, 'author': author.pk}
-            serializer = SubscriptionSerializer(
-                data=data, context=self.get_serializer_context())
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
-            return Response(
-                serializer.data, status=status.HTTP_201_CREATED)
-
-        elif request.method == 'DELETE':
-            subscription, _ = Subscription.objects.filter(
-                user=user, author=self.get_object()
-            ).delete()
-            if subscription == 0:
+            if author_id == user.pk:
                 return Response(
-                    {'detail': 'Вы не подписаны на этого пользователя!'},
+                    {'detail': 'Вы не можете подписаться на себя!'},
                     status=status.HTTP_400_BAD_REQUEST)
-            return Response(status=status.HTTP_204_NO_CONTENT)
+            created = Subscription.objects.subscribe(user, author_id)
+            author = get_object_or_404(User, pk=author_id)
+            if not created:
+                return Response(
+                    {'detail': 'Вы уже подписаны на этого пользователя!'},
+                    status=status.HTTP_400_BAD_REQUEST)
+            serializer = UserSubscriptionSerializer(
+                author, context=self.get_serializer_context())
+            return Response(
+                serializer.data, status=status.HTTP_201_CREATED)
 
-        return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
+        if not Subscription.objects.unsubscribe(user, author_id):
+            get_object_or_404(User, pk=author_id)
+            return Response(
+                {'detail': 'Вы не подписаны на этого пользователя!'},
+                status=status.HTTP_400_BAD_REQUEST)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     """Отображение тегов."""
 
+    catalog = TAGS
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (permissions.AllowAny,)
     pagination_class = None
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     """Отображение ингридиентов."""
 
+    catalog = INGREDIENTS
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (permissions.AllowAny,)
@@ -151,47 +198,74 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_class = IngredientFilter
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        """Поиск по началу названия через индекс в памяти."""
+        limit = request.query_params.get('limit')
+        return self.get_conditional_response(
+            request, lambda: Response(ingredient_index.search(
+                request.query_params.get('name', ''),
+                int(limit) if limit and limit.isdigit() else None,
+            ))
+        )
+
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(AnonymousListCacheMixin, FastReadMixin,
+                    viewsets.ModelViewSet):
     """Отображение рецептов."""
 
     queryset = Recipe.objects.select_related('author').prefetch_related(
         'recipe_ingredients__ingredient', 'tags'
     )
     serializer_class = RecipeСreateUpdateSerializer
+    fast_serializer_class = RecipeFastSerializer
     permission_classes = (IsOwnerOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
     pagination_class = PagePaginator
+    cursor_ordering = '-id'
+    cursor_unsupported_params = ('ordering', 'search')
+    lookup_value_regex = r'\d+'
     http_method_names = ('get', 'post', 'patch', 'delete')
 
-    def add_delete_recipe(self, request, model=None,
-                          serializer_class=None, pk=None):
-        """Механика добавления/удаления рецепта из избранного/корзины."""
+    def get_queryset(self):
+        """Аннотирует рецепты флагами избранного и корзины."""
+        queryset = super().get_queryset()
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset
+        return queryset.annotate(
+            is_favorited=Exists(Favourite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingList.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+        )
+
+    def add_delete_recipe(self, request, model, pk):
+        """Механика добавления/удаления рецепта из избранного/корзины.
 
+        Связь добавляется или удаляется одним запросом, а причина
+        неудачи выясняется уже после него.
+        """
         user = request.user
+        recipe_id = int(pk)
 
         if request.method == 'POST':
-            recipe = get_object_or_404(Recipe, pk=pk)
-            data = {'user': user.pk, 'recipe': recipe.pk}
-            serializer = serializer_class(
-                data=data, context=self.get_serializer_context())
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-
-        elif request.method == 'DELETE':
-            deleted_count, _ = model.objects.filter(
-                user=user, recipe=self.get_object()
-            ).delete()
-
-            if deleted_count == 0:
+            created = model.objects.add_recipe(user, recipe_id)
+            recipe = get_object_or_404(Recipe, pk=recipe_id)
+            if not created:
                 return Response(
-                    {'detail': 'Рецепт не найден!'},
+                    {'detail': 'Рецепт уже добавлен!'},
                     status=status.HTTP_400_BAD_REQUEST)
-            return Response(status=status.HTTP_204_NO_CONTENT)
+            serializer = SimpleRecipeSerializer(
+                recipe, context=self.get_serializer_context())
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
+        if not model.objects.remove_recipe(user, recipe_id):
+            get_object_or_404(Recipe, pk=recipe_id)
+            return Response(
+                {'detail': 'Рецепт не найден!'},
+                status=status.HTTP_400_BAD_REQUEST)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
         detail=True,
@@ -201,9 +275,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=[permissions.IsAuthenticated])
     def favorite(self, request, pk=None):
         """Вызов функуции по добавлению/удалению рецепта из избранного."""
-        return self.add_delete_recipe(
-            request, Favourite, FavoriteSerializer, pk
-        )
+        return self.add_delete_recipe(request, Favourite, pk)
 
     @action(
         detail=True,
@@ -214,46 +286,142 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def shopping_cart(self, request, pk=None):
         """Вызов функции по добавлению/удалению рецепта из корзины покупок."""
-        return self.add_delete_recipe(
-            request, ShoppingList, ShoppingListSerializer, pk
-        )
+        return self.add_delete_recipe(request, ShoppingList, pk)
+
+    batch_statuses = {
+        'POST': ('added', 'exists'),
+        'DELETE': ('removed', 'absent'),
+    }
+
+    def batch_add_delete_recipes(self, request, model):
+        """Массовое добавление/удаление рецептов из избранного/корзины.
 
-    def _create_shopping_list_content(self, user):
-        """Создает списк покупок."""
-        buffer = io.BytesIO()
-        ingredients = ShoppingList.objects.filter(user=user).values(
-            'recipe__ingredients__name',
-            'recipe__ingredients__measurement_unit'
-        ).annotate(total_amount=Sum('recipe__recipe_ingredients__amount'))
-
-        content = '\n'.join([
-            f"{item['recipe__ingredients__name']} - {item['total_amount']} "
-            f"{item['recipe__ingredients__measurement_unit']}"
-            for item in ingredients
+        Возвращает статус для каждого переданного id. DELETE без тела
+        очищает список целиком.
+        """
+        user = request.user
+
+        if request.method == 'DELETE' and not request.data:
+            return Response([
+                {'id': pk, 'status': 'removed'}
+                for pk in model.objects.remove_recipes(user)
+            ])
+
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+        found = set(Recipe.objects.filter(
+            pk__in=recipe_ids
+        ).values_list('pk', flat=True))
+        existing_ids = [pk for pk in recipe_ids if pk in found]
+        if request.method == 'POST':
+            changed = model.objects.add_recipes(user, existing_ids)
+        else:
+            changed = model.objects.remove_recipes(user, existing_ids)
+
+        changed = set(changed)
+        done, skipped = self.batch_statuses[request.method]
+        return Response([
+            {
+                'id': pk,
+                'status': (
+                    done if pk in changed
+                    else skipped if pk in found
+                    else 'not_found'
+                ),
+            }
+            for pk in recipe_ids
         ])
 
-        buffer.write(content.encode('utf-8'))
+    @action(
+        detail=False,
+        methods=('POST', 'DELETE'),
+        url_path='favorite',
+        url_name='favorite_batch',
+        permission_classes=[permissions.IsAuthenticated]
+    )
+    def favorite_batch(self, request):
+        """Массовое добавление/удаление рецептов из избранного."""
+        return self.batch_add_delete_recipes(request, Favourite)
 
-        buffer.seek(0)
-        return buffer
+    @action(
+        detail=False,
+        methods=('POST', 'DELETE'),
+        url_path='shopping_cart',
+        url_name='shopping_cart_batch',
+        permission_classes=[permissions.IsAuthenticated]
+    )
+    def shopping_cart_batch(self, request):
+        """Массовое добавление/удаление рецептов из корзины покупок."""
+        return self.batch_add_delete_recipes(request, ShoppingList)
+
+    shopping_list_formats = {
+        'txt': 'text/plain; charset=utf-8',
+        'csv': 'text/csv; charset=utf-8',
+        'json': 'application/json; charset=utf-8',
+    }
+
+    @staticmethod
+    def _get_shopping_list_ingredients(user):
+        """Читает суммы ингредиентов из корзины пользователя."""
+        return ShoppingCartItem.objects.filter(user=user).values(
+            'ingredient__name', 'ingredient__measurement_unit',
+            'total_amount'
+        ).order_by('ingredient__name', 'ingredient__measurement_unit')
+
+    @staticmethod
+    def _stream_shopping_list(ingredients, file_format):
+        """Построчно отдает список покупок в выбранном формате."""
+        rows = (
+            (item['ingredient__name'], item['total_amount'],
+             item['ingredient__measurement_unit'])
+            for item in ingredients.iterator()
+        )
+        if file_format == 'csv':
+            writer = csv.writer(Echo())
+            yield writer.writerow(('name', 'amount', 'measurement_unit'))
+            for row in rows:
+                yield writer.writerow(row)
+        elif file_format == 'json':
+            separator = '['
+            for name, amount, unit in rows:
+                yield separator + json.dumps(
+                    {'name': name, 'amount': amount,
+                     'measurement_unit': unit},
+                    ensure_ascii=False,
+                )
+                separator = ',\n'
+            yield '[]' if separator == '[' else ']'
+        else:
+            separator = ''
+            for name, amount, unit in rows:
+                yield f'{separator}{name} - {amount} {unit}'
+                separator = '\n'
 
     @action(
         detail=False,
         methods=('GET',),
         url_path='download_shopping_cart',
         url_name='download_shopping_cart',
-        permission_classes=[permissions.IsAuthenticated]
+        permission_classes=[permissions.IsAuthenticated],
+        content_negotiation_class=FileFormatNegotiation,
     )
     def download_shopping_cart(self, request):
         """Скачивание списока покупок для текущего пользователя."""
         user = request.user
-        buffer = self._create_shopping_list_content(user)
+        file_format = request.query_params.get('format', 'txt')
+        if file_format not in self.shopping_list_formats:
+            raise ValidationError(
+                {'format': 'Доступные форматы: txt, csv, json.'}
+            )
 
-        filename = f"{user.username}_shopping_list.txt"
-        response = HttpResponse(
-            buffer.getvalue(),
-            content_type='text/plain; charset=utf-8'
+        response = StreamingHttpResponse(
+            self._stream_shopping_list(
+                self._get_shopping_list_ingredients(user), file_format
+            ),
+            content_type=self.shopping_list_formats[file_format],
         )
+        filename = f"{user.username}_shopping_list.{file_format}"
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
         return response
 
@@ -265,11 +433,23 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def get_link(self, request, pk=None):
         """Отображение короткой ссылки на рецепт."""
         recipe = self.get_object()
-        short_link = f'{settings.BASE_URL}/api/s/{recipe.short_id}'
+        short_link = f'{settings.BASE_URL}/api/s/{recipe.get_short_id()}'
         return Response({'short-link': short_link})
 
 
+def resolve_short_id(short_id):
+    """Адрес рецепта по короткому id, старые случайные id ищутся по полю."""
+    pk = decode_short_id(short_id)
+    if pk is not None:
+        recipes = Recipe.objects.filter(pk=pk)
+    else:
+        recipes = Recipe.objects.filter(short_id=short_id)
+    recipe = recipes.only('pk').first()
+    if recipe is None:
+        raise Http404('Рецепт не найден.')
+    return recipe.get_absolute_url()
+
+
 def redirect_to_recipe(request, short_id):
     """Переправление на страницу рецепта по короткой ссылке."""
-    recipe = get_object_or_404(Recipe, short_id=short_id)
-    return redirect(recipe.get_absolute_url())
+    return redirect(resolve_short_id(short_id))
@@ -0,0 +1,177 @@
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from food_recipes.models import (
+    Favourite,
+    Ingredient,
+    IngredientForRecipe,
+    Recipe,
+    ShoppingList,
+    Tag,
+)
+from users.models import Subscription
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def test_settings(settings, tmp_path):
+    """Кеш в памяти и временный каталог для загружаемых файлов."""
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+    settings.MEDIA_ROOT = tmp_path
+    settings.DB_STATS_HEADERS = True
+
+
+@pytest.fixture
+def foodgram(transactional_db):
+    """Пользователи, теги, ингредиенты и рецепты для тестов API.
+
+    У первого пользователя 10 рецептов в избранном и корзине и подписки
+    на всех остальных авторов. Тесты идут без общей транзакции, чтобы
+    transaction.atomic() не добавлял в счетчики запросов SAVEPOINT.
+    """
+    users = [
+        User.objects.create_user(
+            email=f'user{index}@foodgram.ru',
+            username=f'user{index}',
+            first_name='Имя',
+            last_name='Фамилия',
+            password='Password-123',
+        )
+        for index in range(12)
+    ]
+    tags = [
+        Tag.objects.create(name=f'Тег {index}', slug=f'tag{index}')
+        for index in range(3)
+    ]
+    ingredients = [
+        Ingredient.objects.create(
+            name=f'Ингредиент {index}', measurement_unit='г')
+        for index in range(10)
+    ]
+    recipes = []
+    for index, author in enumerate(users * 2):
+        recipe = Recipe.objects.create(
+            author=author,
+            name=f'Рецепт {index}',
+            text='Описание',
+            cooking_time=10,
+            image='food_recipes/recipe.png',
+        )
+        recipe.tags.set(tags[:index % 3 + 1])
+        IngredientForRecipe.objects.bulk_create(
+            IngredientForRecipe(
+                recipe=recipe, ingredient=ingredient, amount=index + 1)
+            for ingredient in ingredients[index % 5:index % 5 + 4]
+        )
+        recipes.append(recipe)
+
+    user = users[0]
+    recipe_ids = [recipe.pk for recipe in recipes[:10]]
+    Favourite.objects.add_recipes(user, recipe_ids)
+    ShoppingList.objects.add_recipes(user, recipe_ids)
+    for author in users[1:]:
+        Subscription.objects.subscribe(user, author.pk)
+    return SimpleNamespace(
+        user=user,
+        users=users,
+        tags=tags,
+        ingredients=ingredients,
+        recipes=recipes,
+    )
+
+
+@pytest.fixture
+def png():
+    """Изображение 1x1 в base64, как его присылает фронтенд."""
+    return (
+        'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJ'
+        'AAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=='
+    )
+
+
+@pytest.fixture
+def recipe_payload(foodgram, png):
+    """Строит тело запроса на создание или изменение рецепта.
+
+    offset сдвигает набор ингредиентов и тегов относительно исходного.
+    """
+
+    def build(offset=0):
+        return {
+            'ingredients': [
+                {'id': ingredient.pk, 'amount': offset + index + 1}
+                for index, ingredient in enumerate(
+                    foodgram.ingredients[offset:offset + 4])
+            ],
+            'tags': [tag.pk for tag in foodgram.tags[offset:offset + 2]],
+            'image': png,
+            'name': 'Новый рецепт',
+            'text': 'Описание',
+            'cooking_time': 15,
+        }
+
+    return build
+
+
+@pytest.fixture
+def admin_user(db):
+    """Суперпользователь; вход в админку по email."""
+    return User.objects.create_superuser(
+        email='admin@foodgram.ru',
+        username='admin',
+        first_name='Админ',
+        last_name='Админов',
+        password='Password-123',
+    )
+
+
+@pytest.fixture
+def anon_client():
+    return APIClient()
+
+
+@pytest.fixture
+def user_client(foodgram):
+    """Клиент первого пользователя с авторизацией по токену."""
+    client = APIClient()
+    token = Token.objects.create(user=foodgram.user)
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+@pytest.fixture
+def assert_query_budget(settings):
+    """Выполняет запрос и проверяет его бюджет из QUERY_BUDGETS.
+
+    Считаются и запросы, выполненные при чтении потокового ответа.
+    Возвращает ответ и число запросов.
+    """
+
+    def check(client, method, url, **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(client, method.lower())(url, **kwargs)
+            if response.streaming:
+                response.streaming_content = [
+                    b''.join(response.streaming_content)]
+        view_name = resolve(urlsplit(url).path).view_name
+        budget = settings.QUERY_BUDGETS[view_name][method.upper()]
+        assert len(context) <= budget, (
+            f'{method} {url}: {len(context)} > {budget}\n'
+            + '\n'.join(query['sql'] for query in context.captured_queries)
+        )
+        return response, len(context)
+
+    return check
@@ -1,11 +1,14 @@
 from django.contrib import admin
+from django.db import transaction
 from django.db.models import Prefetch
 
+from .admin_utils import AutocompleteFilter, LargeTableAdmin
 from .models import (
     Favourite,
     Ingredient,
     IngredientForRecipe,
     Recipe,
+    ShoppingCartItem,
     ShoppingList,
     Tag,
 )
@@ -26,13 +29,14 @@ class IngredientAdmin(admin.ModelAdmin):
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(LargeTableAdmin):
     list_display = ('id', 'name', 'author', 'tags_list',
                     'ingredients_list', 'added_favorites')
     list_display_links = ('name',)
     search_fields = ('name',)
-    list_filter = ('tags', 'author__username')
+    list_filter = ('tags', ('author', AutocompleteFilter))
     readonly_fields = ('added_favorites',)
+    autocomplete_fields = ('author',)
 
     def get_queryset(self, request):
         """Оптимизация запросов"""
@@ -42,11 +46,11 @@ class RecipeAdmin(admin.ModelAdmin):
             Prefetch('ingredients', queryset=Ingredient.objects.all()),
         )
 
+    @admin.display(description='Всего в избранном',
+                   ordering='favorites_count')
     def added_favorites(self, obj):
-        """Подсчет общего числа добавлений рецепта в избранное."""
-        return Favourite.objects.filter(recipe=obj).count()
-
-    added_favorites.short_description = 'Всего в избранном'
+        """Общее число добавлений рецепта в избранное."""
+        return obj.favorites_count
 
     @admin.display(description='Теги')
     def tags_list(self, obj):
@@ -62,21 +66,105 @@ class RecipeAdmin(admin.ModelAdmin):
 
 
 @admin.register(Favourite)
-class FavouritesAdmin(admin.ModelAdmin):
+class FavouritesAdmin(LargeTableAdmin):
     list_display = ('id', 'user', 'recipe')
     list_display_links = ('user',)
-    list_filter = ('recipe__name', 'user__username')
+    list_filter = (
+        ('recipe', AutocompleteFilter),
+        ('user', AutocompleteFilter),
+    )
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
 
 
 @admin.register(ShoppingList)
-class ShoppingListAdmin(admin.ModelAdmin):
+class ShoppingListAdmin(LargeTableAdmin):
     list_display = ('id', 'user', 'recipe')
     list_display_links = ('user',)
-    list_filter = ('recipe__name', 'user__username')
+    list_filter = (
+        ('recipe', AutocompleteFilter),
+        ('user', AutocompleteFilter),
+    )
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
+
+    @staticmethod
+    def get_relations(queryset):
+        return list(queryset.values_list('user_id', 'recipe_id'))
+
+    def save_model(self, request, obj, form, change):
+        """Переносит изменение списка покупок в суммы корзин."""
+        with transaction.atomic():
+            if change:
+                ShoppingCartItem.objects.apply_shopping_lists(
+                    self.get_relations(
+                        ShoppingList.objects.filter(pk=obj.pk)),
+                    sign=-1,
+                )
+            super().save_model(request, obj, form, change)
+            ShoppingCartItem.objects.apply_shopping_lists(
+                [(obj.user_id, obj.recipe_id)])
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            ShoppingCartItem.objects.apply_shopping_lists(
+                [(obj.user_id, obj.recipe_id)], sign=-1)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            relations = self.get_relations(queryset)
+            super().delete_queryset(request, queryset)
+            ShoppingCartItem.objects.apply_shopping_lists(
+                relations, sign=-1)
 
 
 @admin.register(IngredientForRecipe)
-class IngredientForRecipeAdmin(admin.ModelAdmin):
+class IngredientForRecipeAdmin(LargeTableAdmin):
     list_display = ('id', 'ingredient', 'recipe', 'amount', )
     list_display_links = ('ingredient',)
-    list_filter = ('recipe__name',)
+    list_filter = (('recipe', AutocompleteFilter),)
+    list_select_related = ('ingredient', 'recipe')
+    autocomplete_fields = ('ingredient', 'recipe')
+
+    def save_model(self, request, obj, form, change):
+        """Переносит изменение ингредиентов рецепта в суммы корзин."""
+        recipe_ids = {obj.recipe_id}
+        if change:
+            recipe_ids.update(IngredientForRecipe.objects.filter(
+                pk=obj.pk).values_list('recipe_id', flat=True))
+        with ShoppingCartItem.objects.updating_recipes(recipe_ids):
+            super().save_model(request, obj, form, change)
+
+    def delete_model(self, request, obj):
+        with ShoppingCartItem.objects.updating_recipes((obj.recipe_id,)):
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with ShoppingCartItem.objects.updating_recipes(
+            set(queryset.values_list('recipe_id', flat=True))
+        ):
+            super().delete_queryset(request, queryset)
+
+
+@admin.register(ShoppingCartItem)
+class ShoppingCartItemAdmin(LargeTableAdmin):
+    """Суммы корзин только для просмотра.
+
+    Таблица поддерживается автоматически; расхождения исправляет
+    команда rebuild_shopping_cart.
+    """
+
+    list_display = ('id', 'user', 'ingredient', 'total_amount')
+    list_display_links = ('user',)
+    list_filter = (('user', AutocompleteFilter),)
+    list_select_related = ('user', 'ingredient')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,96 @@
+from django import forms
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """Фильтр по внешнему ключу с поиском вместо полного списка значений.
+
+    Варианты подгружаются через autocomplete-представление админки, поэтому
+    у ModelAdmin связанной модели должны быть заданы search_fields.
+    """
+
+    template = 'admin/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin,
+                 field_path):
+        self.lookup_kwarg = (
+            f'{field_path}__{field.target_field.name}__exact'
+        )
+        self.lookup_val = params.get(self.lookup_kwarg)
+        super().__init__(
+            field, request, params, model, model_admin, field_path)
+        self.widget = forms.ModelChoiceField(
+            field.remote_field.model._default_manager.all(),
+            required=False,
+            widget=AutocompleteSelect(field, model_admin.admin_site),
+        ).widget
+
+    def has_output(self):
+        return True
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def choices(self, changelist):
+        self.query_string = changelist.get_query_string(
+            remove=[self.lookup_kwarg])
+        yield {
+            'selected': self.lookup_val is None,
+            'query_string': self.query_string,
+            'display': 'Все',
+        }
+
+    def rendered_widget(self):
+        """Поле выбора, при изменении которого применяется фильтр."""
+        return self.widget.render(
+            self.lookup_kwarg,
+            self.lookup_val,
+            attrs={
+                'id': f'filter_{self.lookup_kwarg}',
+                'data-width': '100%',
+                'data-query-string': self.query_string,
+            },
+        )
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор, берущий размер нефильтрованной таблицы из статистики.
+
+    На PostgreSQL COUNT(*) по большой таблице читает её целиком, поэтому
+    без условий WHERE используется оценка pg_class.reltuples.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE relname = %s',
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] > 0:
+                return int(row[0])
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Базовый класс админки для таблиц с миллионами строк."""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        return super().media + AutocompleteSelect(
+            None, self.admin_site
+        ).media + forms.Media(js=(
+            'admin/js/jquery.init.js',
+            'food_recipes/js/autocomplete_filter.js',
+        ))
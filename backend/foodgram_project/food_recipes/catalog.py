@@ -0,0 +1,103 @@
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Ingredient
+
+TAGS = 'tags'
+INGREDIENTS = 'ingredients'
+RECIPES = 'recipes'
+# Популярность рецептов: от нее зависят только страницы ?ordering=popular.
+POPULARITY = 'popularity'
+
+
+def _version_key(catalog):
+    return f'catalog_version:{catalog}'
+
+
+def get_catalog_version(catalog):
+    """Возвращает текущую версию справочника тегов или ингредиентов.
+
+    Если версия потеряна из кеша, справочник считается только что
+    измененным.
+    """
+    version = cache.get(_version_key(catalog))
+    if version is None:
+        cache.add(_version_key(catalog), time.time_ns(), timeout=None)
+        version = cache.get(_version_key(catalog))
+    return version
+
+
+def bump_catalog_version(catalog):
+    """Помечает справочник измененным.
+
+    Версия - время изменения в наносекундах, поэтому из нее же
+    получается заголовок Last-Modified.
+    """
+    cache.set(_version_key(catalog), time.time_ns(), timeout=None)
+
+
+def bump_catalog_version_on_commit(catalog):
+    """Помечает справочник измененным после фиксации транзакции.
+
+    Иначе параллельный запрос мог бы закешировать под новой версией
+    данные, которых изменение еще не коснулось.
+    """
+    transaction.on_commit(lambda: bump_catalog_version(catalog))
+
+
+def bump_recipes_version():
+    """Сбрасывает кеш списка рецептов после фиксации транзакции."""
+    bump_catalog_version_on_commit(RECIPES)
+
+
+def bump_popularity_version():
+    """Сбрасывает кеш страниц, отсортированных по популярности."""
+    bump_catalog_version_on_commit(POPULARITY)
+
+
+class IngredientIndex:
+    """Отсортированный индекс ингредиентов в памяти процесса.
+
+    Отвечает на запросы по началу названия без учета регистра
+    бинарным поиском и перестраивается, когда меняется версия
+    справочника ингредиентов.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._index = ([], [])
+
+    def _refresh(self):
+        version = get_catalog_version(INGREDIENTS)
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            items = sorted(
+                Ingredient.objects.values('id', 'name', 'measurement_unit'),
+                key=lambda item: (item['name'].casefold(), item['id']),
+            )
+            self._index = (
+                [item['name'].casefold() for item in items], items
+            )
+            self._version = version
+
+    def search(self, prefix='', limit=None):
+        """Ингредиенты, название которых начинается с prefix."""
+        self._refresh()
+        keys, items = self._index
+        prefix = prefix.casefold()
+        start = bisect_left(keys, prefix)
+        end = bisect_right(keys, f'{prefix}\U0010ffff', lo=start)
+        if limit is not None:
+            end = min(end, start + limit)
+        return items[start:end]
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,25 @@
+class CounterFieldsMixin:
+    """Не перезаписывает денормализованные счетчики при обычном save().
+
+    Счетчики меняются через F() в менеджерах и сигналах, а значение в
+    памяти объекта к моменту сохранения могло устареть. Поля из
+    counter_fields сохраняются, только если явно переданы в update_fields.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            not args
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+            and not self._state.adding
+        ):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
@@ -0,0 +1,97 @@
+import hashlib
+import io
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from jobs.tasks import task
+
+from .catalog import RECIPES, bump_catalog_version
+
+DERIVATIVES_DIR = 'derivatives'
+
+
+def get_variants():
+    """Варианты изображения: имя -> (ширина или None, формат)."""
+    width = settings.IMAGE_THUMBNAIL_WIDTH
+    return {
+        'thumbnail': (width, 'JPEG'),
+        'thumbnail_webp': (width, 'WEBP'),
+        'webp': (None, 'WEBP'),
+    }
+
+
+def render_variant(image, width, image_format):
+    """Масштабирует изображение до ширины width и кодирует в формат."""
+    if width and image.width > width:
+        image = image.resize(
+            (width, round(image.height * width / image.width)),
+            Image.LANCZOS,
+        )
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, quality=settings.IMAGE_QUALITY)
+    return buffer.getvalue()
+
+
+def build_derivatives(field_file):
+    """Создает производные файлы с именами из хеша содержимого.
+
+    Возвращает словарь путей, где source - имя исходного файла.
+    """
+    with field_file.open('rb') as file:
+        content = file.read()
+    digest = hashlib.sha256(content).hexdigest()[:16]
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(content)))
+    derivatives = {'source': field_file.name}
+    for name, (width, image_format) in get_variants().items():
+        extension = 'jpg' if image_format == 'JPEG' else 'webp'
+        path = os.path.join(
+            DERIVATIVES_DIR, f'{digest}_{name}.{extension}'
+        )
+        if not default_storage.exists(path):
+            path = default_storage.save(path, ContentFile(
+                render_variant(image, width, image_format)
+            ))
+        derivatives[name] = path
+    return derivatives
+
+
+def is_stale(instance, image_field, derivatives_field):
+    """Проверяет, соответствуют ли производные текущему изображению."""
+    field_file = getattr(instance, image_field)
+    derivatives = getattr(instance, derivatives_field)
+    return (derivatives or {}).get('source') != (field_file.name or None)
+
+
+@task(unique=True)
+def update_derivatives(model_label, pk, image_field, derivatives_field):
+    """Пересоздает производные изображения объекта и сохраняет их пути."""
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return
+    field_file = getattr(instance, image_field)
+    derivatives = build_derivatives(field_file) if field_file else {}
+    model.objects.filter(
+        pk=pk, **{image_field: field_file.name or ''}
+    ).update(**{derivatives_field: derivatives})
+    bump_catalog_version(RECIPES)
+
+
+def schedule_derivatives(instance, image_field, derivatives_field):
+    """Ставит пересоздание производных в очередь фоновых задач.
+
+    Пока задача ждет запуска, новая не создается: она все равно
+    прочитает объект заново.
+    """
+    if not is_stale(instance, image_field, derivatives_field):
+        return
+    update_derivatives.delay(
+        instance._meta.label, instance.pk, image_field, derivatives_field
+    )
@@ -0,0 +1,16 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.db.models import Index
+
+
+class SearchVectorIndex(GinIndex):
+    """GIN-индекс поискового вектора.
+
+    Вне PostgreSQL вектор не заполняется, и вместо GIN создается обычный
+    индекс, чтобы миграции проходили в любой базе.
+    """
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return Index.create_sql(
+                self, model, schema_editor, using=using, **kwargs)
+        return super().create_sql(model, schema_editor, using=using, **kwargs)
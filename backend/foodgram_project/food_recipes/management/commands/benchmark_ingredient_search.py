@@ -0,0 +1,38 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from api.filters import IngredientFilter
+from api.serializers import IngredientSerializer
+from food_recipes.catalog import ingredient_index
+from food_recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает поиск ингредиентов через ORM и через индекс.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=200)
+        parser.add_argument(
+            '--prefixes', nargs='+', default=('а', 'мо', 'сыр', 'я'))
+
+    def orm_search(self, prefix):
+        queryset = IngredientFilter(
+            {'name': prefix}, queryset=Ingredient.objects.all()
+        ).qs
+        return IngredientSerializer(queryset, many=True).data
+
+    def handle(self, *args, **options):
+        number = options['number']
+        ingredient_index.search()
+        for prefix in options['prefixes']:
+            orm = timeit.timeit(
+                lambda: self.orm_search(prefix), number=number)
+            index = timeit.timeit(
+                lambda: ingredient_index.search(prefix), number=number)
+            self.stdout.write(
+                f'{prefix!r}: '
+                f'{len(ingredient_index.search(prefix))} результатов, '
+                f'ORM {orm / number * 1000:.3f} мс, '
+                f'индекс {index / number * 1000:.3f} мс'
+            )
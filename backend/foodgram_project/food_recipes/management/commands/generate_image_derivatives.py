@@ -0,0 +1,44 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from food_recipes.images import is_stale, update_derivatives
+from food_recipes.models import Recipe
+
+User = get_user_model()
+
+FIELDS = (
+    (Recipe, 'image', 'image_derivatives'),
+    (User, 'avatar', 'avatar_derivatives'),
+)
+
+
+class Command(BaseCommand):
+    help = 'Создает уменьшенные копии для уже загруженных изображений.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересоздать копии, даже если они актуальны.',
+        )
+
+    def handle(self, *args, **options):
+        for model, image_field, derivatives_field in FIELDS:
+            updated = 0
+            queryset = model.objects.exclude(
+                **{image_field: ''}
+            ).exclude(
+                **{f'{image_field}__isnull': True}
+            ).only('pk', image_field, derivatives_field)
+            for instance in queryset.iterator():
+                if options['force'] or is_stale(
+                    instance, image_field, derivatives_field
+                ):
+                    update_derivatives(
+                        model._meta.label, instance.pk,
+                        image_field, derivatives_field
+                    )
+                    updated += 1
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.verbose_name_plural}: обновлено {updated}'
+            ))
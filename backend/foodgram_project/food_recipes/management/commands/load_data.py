@@ -1,33 +1,83 @@
 import csv
+import json
 import os
 
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
-from django.db.utils import IntegrityError
+from django.db import transaction
 
+from food_recipes.catalog import INGREDIENTS, bump_catalog_version
 from food_recipes.models import Ingredient
 
 DATA_ROOT = os.path.join(settings.BASE_DIR, 'static/data/')
 
 
+def read_csv(file):
+    for name, unit in csv.reader(file):
+        yield name, unit
+
+
+def read_json(file):
+    for item in json.load(file):
+        yield item['name'], item['measurement_unit']
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+}
+
+
 class Command(BaseCommand):
+    help = 'Загружает справочник ингредиентов из CSV или JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=os.path.join(DATA_ROOT, 'ingredients.csv'),
+            help='Путь к файлу, по умолчанию static/data/ingredients.csv.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=READERS,
+            help='Формат файла, по умолчанию определяется по расширению.',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
     def handle(self, *args, **options):
+        path = options['path']
+        file_format = (
+            options['format'] or os.path.splitext(path)[1].lstrip('.')
+        )
+        if file_format not in READERS:
+            raise CommandError(f'Неизвестный формат файла: {path}')
+        batch_size = options['batch_size']
+
+        read = 0
         try:
-            with open(
-                os.path.join(
-                    DATA_ROOT, 'ingredients.csv'), 'r', encoding='utf-8'
-            ) as csv_file:
-                data = csv.reader(csv_file)
-                for row in data:
-                    try:
-                        name, unit = row
-                        Ingredient.objects.create(
-                            name=name,
-                            measurement_unit=unit,
-                        )
-                    except IntegrityError:
-                        pass
-                self.stdout.write(self.style.SUCCESS(
-                    'Файл загружен успешно'))
+            with open(path, 'r', encoding='utf-8') as file, \
+                    transaction.atomic():
+                count_before = Ingredient.objects.count()
+                batch = []
+                for name, unit in READERS[file_format](file):
+                    read += 1
+                    batch.append(Ingredient(
+                        name=name.strip(), measurement_unit=unit.strip()
+                    ))
+                    if len(batch) >= batch_size:
+                        Ingredient.objects.bulk_create(
+                            batch, ignore_conflicts=True)
+                        batch = []
+                Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+                inserted = Ingredient.objects.count() - count_before
         except FileNotFoundError:
             raise CommandError('Файл не найден')
+        except (ValueError, KeyError, TypeError) as error:
+            raise CommandError(f'Некорректная запись №{read + 1}: {error}')
+
+        bump_catalog_version(INGREDIENTS)
+        self.stdout.write(self.style.SUCCESS(
+            f'Файл загружен успешно: добавлено {inserted}, '
+            f'пропущено {read - inserted}'
+        ))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from food_recipes.models import ShoppingCartItem
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает или проверяет суммы ингредиентов в корзинах.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только сравнить таблицу с пересчетом, не изменяя её.',
+        )
+
+    def handle(self, *args, **options):
+        if not options['verify']:
+            ShoppingCartItem.objects.rebuild()
+            self.stdout.write(self.style.SUCCESS(
+                'Корзины покупок пересчитаны'))
+            return
+
+        expected = {
+            (item['recipe__shopping_list__user'], item['ingredient']):
+                item['total']
+            for item in ShoppingCartItem.objects.live_totals().iterator()
+        }
+        stored = {
+            (user_id, ingredient_id): total_amount
+            for user_id, ingredient_id, total_amount
+            in ShoppingCartItem.objects.values_list(
+                'user_id', 'ingredient_id', 'total_amount'
+            ).iterator()
+        }
+        mismatches = [
+            key for key in expected.keys() | stored.keys()
+            if expected.get(key) != stored.get(key)
+        ]
+        for user_id, ingredient_id in mismatches:
+            self.stdout.write(
+                f'user={user_id} ingredient={ingredient_id}: '
+                f'{stored.get((user_id, ingredient_id))} != '
+                f'{expected.get((user_id, ingredient_id))}'
+            )
+        if mismatches:
+            raise CommandError(f'Расхождений: {len(mismatches)}')
+        self.stdout.write(self.style.SUCCESS('Расхождений нет'))
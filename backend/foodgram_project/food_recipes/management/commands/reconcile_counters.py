@@ -0,0 +1,61 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from food_recipes.catalog import POPULARITY, bump_catalog_version
+from food_recipes.models import Favourite, Recipe
+
+User = get_user_model()
+
+
+def count_subquery(model, field):
+    """Подзапрос с числом строк model, ссылающихся на внешний объект."""
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+class Command(BaseCommand):
+    help = 'Сверяет и исправляет денормализованные счетчики.'
+
+    counters = (
+        (Recipe, 'favorites_count', Favourite, 'recipe'),
+        (User, 'recipes_count', Recipe, 'author'),
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только найти расхождения, не исправляя их.',
+        )
+
+    def handle(self, *args, **options):
+        mismatches = 0
+        with transaction.atomic():
+            for model, counter, related_model, field in self.counters:
+                drifted = model.objects.annotate(
+                    actual=count_subquery(related_model, field)
+                ).exclude(**{counter: F('actual')})
+                if options['verify']:
+                    found = drifted.count()
+                else:
+                    found = model.objects.filter(
+                        pk__in=list(drifted.values_list('pk', flat=True))
+                    ).update(**{
+                        counter: count_subquery(related_model, field)
+                    })
+                mismatches += found
+                self.stdout.write(
+                    f'{model._meta.label}.{counter}: {found}')
+        if options['verify'] and mismatches:
+            raise CommandError(f'Расхождений: {mismatches}')
+        if mismatches:
+            bump_catalog_version(POPULARITY)
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено: {mismatches}' if mismatches else 'Расхождений нет'
+        ))
@@ -0,0 +1,199 @@
+import io
+import random
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from PIL import Image
+
+from food_recipes.catalog import (
+    INGREDIENTS,
+    POPULARITY,
+    RECIPES,
+    TAGS,
+    bump_catalog_version,
+)
+from food_recipes.models import (
+    Favourite,
+    Ingredient,
+    IngredientForRecipe,
+    Recipe,
+    ShoppingCartItem,
+    ShoppingList,
+    Tag,
+)
+from users.models import Subscription
+
+User = get_user_model()
+
+IMAGE_PATH = 'food_recipes/synthetic.png'
+WORDS = (
+    'суп', 'салат', 'пирог', 'рагу', 'каша', 'запеканка', 'паста',
+    'курица', 'говядина', 'рыба', 'овощи', 'грибы', 'сыр', 'томаты',
+    'быстро', 'остро', 'сладко', 'по-домашнему', 'праздничный', 'летний',
+)
+
+
+def zipf_weights(size, exponent):
+    """Веса популярности: немногие объекты получают большую часть связей."""
+    return [1 / rank ** exponent for rank in range(1, size + 1)]
+
+
+class Command(BaseCommand):
+    help = 'Создает синтетические данные для нагрузочных замеров.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--tags', type=int, default=10)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--favorites', type=int, default=20)
+        parser.add_argument('--carts', type=int, default=5)
+        parser.add_argument('--subscriptions', type=int, default=10)
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель распределения Ципфа для популярности.',
+        )
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.skew = options['skew']
+        if not Ingredient.objects.exists():
+            call_command('load_data')
+        self.ensure_image()
+
+        with transaction.atomic():
+            tags = self.create_tags(options['tags'])
+            users = self.create_users(options['users'])
+            recipes = self.create_recipes(
+                users, tags, options['recipes'],
+                options['ingredients_per_recipe'],
+            )
+            self.create_relations(
+                Favourite, users, recipes, options['favorites'])
+            self.create_relations(
+                ShoppingList, users, recipes, options['carts'])
+            self.create_subscriptions(users, options['subscriptions'])
+            if connection.vendor == 'postgresql':
+                Recipe.objects.filter(pk__in=recipes).update(
+                    search_vector=Recipe.get_search_vector())
+            ShoppingCartItem.objects.rebuild()
+            call_command('reconcile_counters', stdout=io.StringIO())
+
+        for catalog in (TAGS, INGREDIENTS, RECIPES, POPULARITY):
+            bump_catalog_version(catalog)
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: пользователей {len(users)}, рецептов {len(recipes)}'
+        ))
+
+    def ensure_image(self):
+        if default_storage.exists(IMAGE_PATH):
+            return
+        buffer = io.BytesIO()
+        Image.new('RGB', (1200, 800), (200, 120, 60)).save(buffer, 'PNG')
+        default_storage.save(IMAGE_PATH, ContentFile(buffer.getvalue()))
+
+    def create_tags(self, count):
+        existing = Tag.objects.count()
+        Tag.objects.bulk_create(
+            [
+                Tag(name=f'Тег {number}', slug=f'synthetic-{number}')
+                for number in range(existing, count)
+            ],
+            ignore_conflicts=True,
+        )
+        return list(Tag.objects.values_list('pk', flat=True))
+
+    def create_users(self, count):
+        token = uuid.uuid4().hex[:8]
+        password = make_password('synthetic')
+        users = [
+            User(
+                email=f'{token}_{number}@synthetic.local',
+                username=f'synthetic_{token}_{number}',
+                first_name='Имя',
+                last_name='Фамилия',
+                password=password,
+            )
+            for number in range(count)
+        ]
+        User.objects.bulk_create(users, batch_size=self.batch_size)
+        return list(User.objects.filter(
+            username__startswith=f'synthetic_{token}_'
+        ).values_list('pk', flat=True))
+
+    def create_recipes(self, users, tags, count, ingredients_per_recipe):
+        authors = self.random.choices(
+            users, zipf_weights(len(users), self.skew), k=count)
+        recipes = [
+            Recipe(
+                author_id=author,
+                name=' '.join(self.random.sample(WORDS, 3)).capitalize(),
+                text=' '.join(self.random.choices(WORDS, k=60)),
+                cooking_time=self.random.randint(5, 240),
+                image=IMAGE_PATH,
+            )
+            for author in authors
+        ]
+        first_pk = (Recipe.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0) + 1
+        Recipe.objects.bulk_create(recipes, batch_size=self.batch_size)
+        recipe_ids = list(Recipe.objects.filter(
+            pk__gte=first_pk).values_list('pk', flat=True))
+
+        ingredient_ids = list(
+            Ingredient.objects.values_list('pk', flat=True))
+        ingredient_weights = zipf_weights(len(ingredient_ids), self.skew)
+        tag_weights = zipf_weights(len(tags), self.skew)
+        recipe_tags = []
+        recipe_ingredients = []
+        for recipe_id in recipe_ids:
+            for tag_id in set(self.random.choices(
+                    tags, tag_weights, k=self.random.randint(1, 3))):
+                recipe_tags.append(Recipe.tags.through(
+                    recipe_id=recipe_id, tag_id=tag_id))
+            for ingredient_id in set(self.random.choices(
+                    ingredient_ids, ingredient_weights,
+                    k=ingredients_per_recipe)):
+                recipe_ingredients.append(IngredientForRecipe(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredient_id,
+                    amount=self.random.randint(1, 500),
+                ))
+        Recipe.tags.through.objects.bulk_create(
+            recipe_tags, batch_size=self.batch_size)
+        IngredientForRecipe.objects.bulk_create(
+            recipe_ingredients, batch_size=self.batch_size)
+        return recipe_ids
+
+    def create_relations(self, model, users, recipes, per_user):
+        weights = zipf_weights(len(recipes), self.skew)
+        objects = []
+        for user_id in users:
+            count = min(self.random.randint(0, per_user * 2), len(recipes))
+            for recipe_id in set(self.random.choices(
+                    recipes, weights, k=count)):
+                objects.append(model(user_id=user_id, recipe_id=recipe_id))
+        model.objects.bulk_create(
+            objects, batch_size=self.batch_size, ignore_conflicts=True)
+
+    def create_subscriptions(self, users, per_user):
+        weights = zipf_weights(len(users), self.skew)
+        subscriptions = []
+        for user_id in users:
+            count = min(self.random.randint(0, per_user * 2), len(users))
+            for author_id in set(self.random.choices(
+                    users, weights, k=count)):
+                if author_id != user_id:
+                    subscriptions.append(Subscription(
+                        user_id=user_id, author_id=author_id))
+        Subscription.objects.bulk_create(
+            subscriptions, batch_size=self.batch_size, ignore_conflicts=True)
@@ -0,0 +1,58 @@
+# Generated by Django 3.2.16 on 2025-03-10 09:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_shopping_cart_items(apps, schema_editor):
+    IngredientForRecipe = apps.get_model('food_recipes', 'IngredientForRecipe')
+    ShoppingCartItem = apps.get_model('food_recipes', 'ShoppingCartItem')
+    totals = IngredientForRecipe.objects.filter(
+        recipe__shopping_list__isnull=False
+    ).values(
+        'recipe__shopping_list__user', 'ingredient'
+    ).annotate(total=models.Sum('amount')).order_by()
+    ShoppingCartItem.objects.bulk_create(
+        [
+            ShoppingCartItem(
+                user_id=item['recipe__shopping_list__user'],
+                ingredient_id=item['ingredient'],
+                total_amount=item['total'],
+            )
+            for item in totals
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('food_recipes', '0003_alter_recipe_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingCartItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_amount', models.IntegerField(default=0, verbose_name='Общее количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_cart_items', to='food_recipes.ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_cart_items', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Ингредиент корзины',
+                'verbose_name_plural': 'Ингредиенты корзин',
+                'ordering': ('user',),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcartitem',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_shopping_cart_item'),
+        ),
+        migrations.RunPython(
+            fill_shopping_cart_items, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 3.2.16 on 2025-03-11 10:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def merge_recipe_rows(IngredientForRecipe, keep_id, ingredient_ids):
+    """Переносит строки рецептов на keep_id, складывая количества.
+
+    Если рецепт использовал несколько повторов ингредиента, остается
+    одна строка с суммой количеств.
+    """
+    kept_rows = {}
+    for row in IngredientForRecipe.objects.filter(
+        ingredient_id__in=ingredient_ids
+    ).order_by('recipe_id', 'ingredient_id', 'id'):
+        kept = kept_rows.get(row.recipe_id)
+        if kept is None:
+            row.ingredient_id = keep_id
+            row.save(update_fields=('ingredient',))
+            kept_rows[row.recipe_id] = row
+        else:
+            kept.amount = min(kept.amount + row.amount, settings.MAX_AMOUNT)
+            kept.save(update_fields=('amount',))
+            row.delete()
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    """Сводит повторы ингредиентов от повторных запусков load_data.
+
+    В PostgreSQL отложенные проверки внешних ключей после удаления
+    повторов выполняются сразу: иначе ALTER TABLE для ограничения
+    падает с ошибкой pending trigger events.
+    """
+    Ingredient = apps.get_model('food_recipes', 'Ingredient')
+    IngredientForRecipe = apps.get_model('food_recipes', 'IngredientForRecipe')
+    ShoppingCartItem = apps.get_model('food_recipes', 'ShoppingCartItem')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(
+        keep_id=models.Min('id'), total=models.Count('id')
+    ).filter(total__gt=1).order_by()
+    for group in duplicates:
+        duplicate_ids = list(Ingredient.objects.filter(
+            name=group['name'], measurement_unit=group['measurement_unit']
+        ).exclude(id=group['keep_id']).values_list('id', flat=True))
+        merge_recipe_rows(
+            IngredientForRecipe, group['keep_id'],
+            [group['keep_id'], *duplicate_ids],
+        )
+        for item in ShoppingCartItem.objects.filter(
+            ingredient_id__in=duplicate_ids
+        ):
+            kept, _ = ShoppingCartItem.objects.get_or_create(
+                user_id=item.user_id, ingredient_id=group['keep_id']
+            )
+            kept.total_amount += item.total_amount
+            kept.save(update_fields=('total_amount',))
+        Ingredient.objects.filter(id__in=duplicate_ids).delete()
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food_recipes', '0004_shoppingcartitem'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2025-03-12 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food_recipes', '0005_unique_ingredient'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='short_id',
+            field=models.CharField(blank=True, max_length=10, null=True, unique=True),
+        ),
+    ]
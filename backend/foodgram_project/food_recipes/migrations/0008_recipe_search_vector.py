@@ -0,0 +1,40 @@
+# Generated by Django 3.2.16 on 2025-03-15 12:18
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+import food_recipes.indexes
+
+
+def fill_search_vector(apps, schema_editor):
+    """Заполняет вектор, только в PostgreSQL."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    config = settings.SEARCH_CONFIG
+    schema_editor.execute(
+        'UPDATE food_recipes_recipe SET search_vector = '
+        'setweight(to_tsvector(%s::regconfig, name), %s) || '
+        'setweight(to_tsvector(%s::regconfig, text), %s)',
+        (config, 'A', config, 'B'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food_recipes', '0007_recipe_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(fill_search_vector, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=food_recipes.indexes.SearchVectorIndex(fields=['search_vector'], name='recipe_search_vector_idx'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 3.2.16 on 2025-03-17 10:02
+
+from django.db import migrations, models
+
+
+def delete_duplicates(model, fields):
+    """Оставляет одну строку на каждую комбинацию fields."""
+    duplicates = model.objects.values(*fields).annotate(
+        keep_id=models.Min('id'), total=models.Count('id')
+    ).filter(total__gt=1).order_by()
+    for group in duplicates:
+        model.objects.filter(
+            **{field: group[field] for field in fields}
+        ).exclude(id=group['keep_id']).delete()
+
+
+def remove_duplicate_rows(apps, schema_editor):
+    Favourite = apps.get_model('food_recipes', 'Favourite')
+    ShoppingList = apps.get_model('food_recipes', 'ShoppingList')
+    IngredientForRecipe = apps.get_model('food_recipes', 'IngredientForRecipe')
+    ShoppingCartItem = apps.get_model('food_recipes', 'ShoppingCartItem')
+    delete_duplicates(Favourite, ('user', 'recipe'))
+    delete_duplicates(ShoppingList, ('user', 'recipe'))
+    delete_duplicates(IngredientForRecipe, ('recipe', 'ingredient'))
+
+    ShoppingCartItem.objects.all().delete()
+    totals = IngredientForRecipe.objects.filter(
+        recipe__shopping_list__isnull=False
+    ).values(
+        'recipe__shopping_list__user', 'ingredient'
+    ).annotate(total=models.Sum('amount')).order_by()
+    ShoppingCartItem.objects.bulk_create(
+        [
+            ShoppingCartItem(
+                user_id=item['recipe__shopping_list__user'],
+                ingredient_id=item['ingredient'],
+                total_amount=item['total'],
+            )
+            for item in totals
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food_recipes', '0008_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_duplicate_rows, migrations.RunPython.noop
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-id'], name='recipe_author_id_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='favourite',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_favourite'),
+        ),
+        migrations.AddConstraint(
+            model_name='ingredientforrecipe',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='unique_recipe_ingredient'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglist',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_shopping_list'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 3.2.16 on 2025-03-19 11:24
+
+from django.db import migrations, models
+
+
+def fill_favorites_count(apps, schema_editor):
+    Recipe = apps.get_model('food_recipes', 'Recipe')
+    Favourite = apps.get_model('food_recipes', 'Favourite')
+    favorites = Favourite.objects.filter(
+        recipe=models.OuterRef('pk')
+    ).order_by().values('recipe').annotate(
+        total=models.Count('pk')
+    ).values('total')
+    Recipe.objects.update(favorites_count=models.functions.Coalesce(
+        models.Subquery(favorites), 0
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food_recipes', '0009_join_table_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Всего в избранном'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-favorites_count', '-id'], name='recipe_popularity_idx'),
+        ),
+        migrations.RunPython(
+            fill_favorites_count, migrations.RunPython.noop
+        ),
+    ]
@@ -1,11 +1,17 @@
-import random
-import string
+from collections import defaultdict
+from contextlib import contextmanager
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
 
+from .counters import CounterFieldsMixin
+from .indexes import SearchVectorIndex
+from .short_ids import encode_short_id
+from .upserts import insert_ignore, insert_ignore_many
 from .validators import validate_slug
 
 User = get_user_model()
@@ -49,14 +55,22 @@ class Ingredient(models.Model):
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
         ordering = ('name',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=('name', 'measurement_unit'),
+                name='unique_ingredient'
+            )
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Recipe(models.Model):
+class Recipe(CounterFieldsMixin, models.Model):
     """Определение модели рецептов."""
 
+    counter_fields = ('favorites_count',)
+
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -94,30 +108,91 @@ class Recipe(models.Model):
         max_length=settings.SHORT_ID_MAX_LENGTH,
         unique=True,
         blank=True,
+        null=True,
+    )
+    image_derivatives = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Уменьшенные копии изображения'
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Всего в избранном'
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор'
     )
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ['-pk']
+        indexes = [
+            models.Index(
+                fields=('author', '-id'),
+                name='recipe_author_id_idx'
+            ),
+            models.Index(
+                fields=('-favorites_count', '-id'),
+                name='recipe_popularity_idx'
+            ),
+            SearchVectorIndex(
+                fields=('search_vector',),
+                name='recipe_search_vector_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
-    def generate_short_id(self):
-        characters = f'{string.ascii_letters}{string.digits}'
-        return ''.join(random.choices(characters,
-                                      k=settings.SHORT_ID_MAX_LENGTH))
+    def delete(self, *args, **kwargs):
+        """Удаляет рецепт вместе с избранным.
 
-    def save(self, *args, **kwargs):
-        """Переопределение метода save для создания короткой ссылки."""
-        if not self.short_id:
-            self.short_id = self.generate_short_id()
-        super().save(*args, **kwargs)
+        Избранное удаляется одним запросом, без сигналов: счетчик
+        удаляемого рецепта обновлять не нужно. Корзины обновляет
+        сигнал pre_delete.
+        """
+        with transaction.atomic():
+            self.favorites.all()._raw_delete(self._state.db)
+            return super().delete(*args, **kwargs)
 
     def get_absolute_url(self):
         return f'/recipes/{self.pk}'
 
+    def get_short_id(self):
+        return encode_short_id(self.pk)
+
+    def update_search_vector(self):
+        """Пересчитывает поисковый вектор по названию и описанию.
+
+        Вектор хранится только в PostgreSQL, в остальных базах поиск
+        работает через icontains.
+        """
+        recipes = Recipe.objects.filter(pk=self.pk)
+        if connections[recipes.db].vendor != 'postgresql':
+            return
+        recipes.update(search_vector=self.get_search_vector())
+
+    @staticmethod
+    def get_search_vector():
+        """Выражение взвешенного поискового вектора рецепта."""
+        return (
+            SearchVector(
+                'name', weight='A', config=settings.SEARCH_CONFIG)
+            + SearchVector(
+                'text', weight='B', config=settings.SEARCH_CONFIG)
+        )
+
+    def get_ingredient_amounts(self):
+        """Количество каждого ингредиента рецепта по его id."""
+        return dict(self.recipe_ingredients.values_list(
+            'ingredient_id', 'amount'
+        ))
+
 
 class IngredientForRecipe(models.Model):
     """Определение промежуточной модели ингридиентов для рецептов."""
@@ -144,11 +219,136 @@ class IngredientForRecipe(models.Model):
         verbose_name = 'Ингредиенты рецепта'
         verbose_name_plural = 'Ингредиенты рецептов'
         ordering = ('ingredient',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=('recipe', 'ingredient'),
+                name='unique_recipe_ingredient'
+            )
+        ]
 
     def __str__(self) -> str:
         return f'{self.recipe},{self.ingredient}'
 
 
+class UserRecipeRelationManager(models.Manager):
+    """Массовое добавление и удаление рецептов пользователя.
+
+    Строки вставляются и удаляются без сигналов, поэтому связанные
+    счетчики обновляются в recipes_added/recipes_removed.
+    """
+
+    def add_recipe(self, user, recipe_id):
+        """Добавляет рецепт одним запросом.
+
+        Возвращает False, если рецепт уже добавлен или не существует.
+        """
+        with transaction.atomic():
+            created = insert_ignore(
+                self.model, 'recipe', user=user.pk, recipe=recipe_id)
+            if created:
+                self.recipes_added(user, [recipe_id])
+        return created
+
+    def remove_recipe(self, user, recipe_id):
+        """Удаляет рецепт одним запросом; False, если его не было."""
+        with transaction.atomic():
+            removed = self.filter(
+                user=user, recipe_id=recipe_id
+            )._raw_delete(self.db) > 0
+            if removed:
+                self.recipes_removed(user, [recipe_id])
+        return removed
+
+    def add_recipes(self, user, recipe_ids):
+        """Добавляет рецепты, которых еще нет; возвращает их id.
+
+        Добавленные id берутся из самого INSERT (RETURNING). В базах без
+        RETURNING строка пользователя блокируется до чтения уже
+        добавленных рецептов. В обоих случаях два одинаковых параллельных
+        запроса не засчитают один рецепт дважды.
+        """
+        if not recipe_ids:
+            return []
+        with transaction.atomic():
+            if connections[self.db].features.can_return_rows_from_bulk_insert:
+                added = insert_ignore_many(
+                    self.model, 'recipe', recipe_ids, user=user.pk)
+            else:
+                list(User.objects.select_for_update().filter(
+                    pk=user.pk).values_list('pk'))
+                existing = set(self.filter(
+                    user=user, recipe_id__in=recipe_ids
+                ).values_list('recipe_id', flat=True))
+                added = [pk for pk in recipe_ids if pk not in existing]
+                self.bulk_create(
+                    [self.model(user=user, recipe_id=pk) for pk in added],
+                    ignore_conflicts=True,
+                )
+            self.recipes_added(user, added)
+        return added
+
+    def remove_recipes(self, user, recipe_ids=None):
+        """Удаляет рецепты (все, если recipe_ids не задан).
+
+        Возвращает id рецептов, которые действительно были удалены.
+        """
+        relations = self.filter(user=user)
+        if recipe_ids is not None:
+            relations = relations.filter(recipe_id__in=recipe_ids)
+        with transaction.atomic():
+            rows = list(relations.select_for_update().values_list(
+                'pk', 'recipe_id'
+            ))
+            if rows:
+                pks, removed = zip(*rows)
+                self.filter(pk__in=pks)._raw_delete(self.db)
+                self.recipes_removed(user, removed)
+        return [recipe_id for _, recipe_id in rows]
+
+    def recipes_added(self, user, recipe_ids):
+        """Обновляет зависимые данные после добавления рецептов."""
+
+    def recipes_removed(self, user, recipe_ids):
+        """Обновляет зависимые данные после удаления рецептов."""
+
+
+class FavouriteManager(UserRecipeRelationManager):
+    """Избранное; поддерживает Recipe.favorites_count.
+
+    Счетчик влияет на сортировку по популярности, поэтому после
+    изменения сбрасывается кеш отсортированных по ней страниц.
+    """
+
+    def recipes_added(self, user, recipe_ids):
+        if recipe_ids:
+            Recipe.objects.filter(pk__in=recipe_ids).update(
+                favorites_count=F('favorites_count') + 1)
+            self.bump_popularity_version()
+
+    def recipes_removed(self, user, recipe_ids):
+        if recipe_ids:
+            Recipe.objects.filter(
+                pk__in=recipe_ids, favorites_count__gt=0
+            ).update(favorites_count=F('favorites_count') - 1)
+            self.bump_popularity_version()
+
+    @staticmethod
+    def bump_popularity_version():
+        # catalog импортирует модели, поэтому импорт здесь.
+        from .catalog import bump_popularity_version
+        bump_popularity_version()
+
+
+class ShoppingListManager(UserRecipeRelationManager):
+    """Список покупок; поддерживает суммы ShoppingCartItem."""
+
+    def recipes_added(self, user, recipe_ids):
+        ShoppingCartItem.objects.add_recipes(user, recipe_ids)
+
+    def recipes_removed(self, user, recipe_ids):
+        ShoppingCartItem.objects.remove_recipes(user, recipe_ids)
+
+
 class Favourite(models.Model):
     """Определение модели избранного."""
 
@@ -162,10 +362,18 @@ class Favourite(models.Model):
         related_name='favorites'
     )
 
+    objects = FavouriteManager()
+
     class Meta:
         verbose_name = 'Избранное'
         verbose_name_plural = 'Избранное'
         ordering = ('user',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_favourite'
+            )
+        ]
 
     def __str__(self):
         return f'{self.user},{self.recipe}'
@@ -184,10 +392,207 @@ class ShoppingList(models.Model):
         related_name='shopping_list'
     )
 
+    objects = ShoppingListManager()
+
     class Meta:
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Списки покупок'
         ordering = ('user',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_shopping_list'
+            )
+        ]
 
     def __str__(self):
         return f'{self.user},{self.recipe}'
+
+
+class ShoppingCartItemManager(models.Manager):
+    """Поддерживает суммы корзины покупок в актуальном состоянии."""
+
+    def apply_delta(self, user_ids, amounts):
+        """Прибавляет amounts ({id ингредиента: дельта}) к корзинам."""
+        amounts = {
+            ingredient_id: amount
+            for ingredient_id, amount in amounts.items() if amount
+        }
+        user_ids = set(user_ids)
+        if not amounts or not user_ids:
+            return
+        with transaction.atomic():
+            self.bulk_create(
+                [
+                    self.model(user_id=user_id, ingredient_id=ingredient_id)
+                    for user_id in user_ids
+                    for ingredient_id in amounts
+                ],
+                ignore_conflicts=True,
+            )
+            items = self.filter(
+                user_id__in=user_ids, ingredient_id__in=amounts
+            )
+            items.update(total_amount=F('total_amount') + Case(
+                *[
+                    When(ingredient_id=ingredient_id, then=Value(amount))
+                    for ingredient_id, amount in amounts.items()
+                ],
+                default=Value(0),
+                output_field=IntegerField(),
+            ))
+            items.filter(total_amount__lte=0).delete()
+
+    def add_recipe(self, user, recipe):
+        """Добавляет ингредиенты рецепта в корзину пользователя."""
+        self.apply_delta((user.pk,), recipe.get_ingredient_amounts())
+
+    def remove_recipe(self, user, recipe):
+        """Вычитает ингредиенты рецепта из корзины пользователя."""
+        self.apply_delta((user.pk,), {
+            ingredient_id: -amount
+            for ingredient_id, amount
+            in recipe.get_ingredient_amounts().items()
+        })
+
+    @staticmethod
+    def get_recipes_amounts(recipe_ids):
+        """Суммарное количество ингредиентов нескольких рецептов."""
+        return dict(IngredientForRecipe.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values('ingredient').annotate(
+            total=Sum('amount')
+        ).order_by().values_list('ingredient', 'total'))
+
+    def add_recipes(self, user, recipe_ids):
+        """Добавляет ингредиенты нескольких рецептов в корзину."""
+        if recipe_ids:
+            self.apply_delta(
+                (user.pk,), self.get_recipes_amounts(recipe_ids))
+
+    def remove_recipes(self, user, recipe_ids):
+        """Вычитает ингредиенты нескольких рецептов из корзины."""
+        if recipe_ids:
+            self.apply_delta((user.pk,), {
+                ingredient_id: -amount
+                for ingredient_id, amount
+                in self.get_recipes_amounts(recipe_ids).items()
+            })
+
+    def apply_shopping_lists(self, relations, sign=1):
+        """Прибавляет (sign=1) или вычитает (sign=-1) рецепты в корзинах.
+
+        relations — пары (id пользователя, id рецепта) списка покупок.
+        """
+        recipes_by_user = defaultdict(list)
+        for user_id, recipe_id in relations:
+            recipes_by_user[user_id].append(recipe_id)
+        for user_id, recipe_ids in recipes_by_user.items():
+            self.apply_delta((user_id,), {
+                ingredient_id: sign * amount
+                for ingredient_id, amount
+                in self.get_recipes_amounts(recipe_ids).items()
+            })
+
+    @contextmanager
+    def updating_recipes(self, recipe_ids):
+        """Переносит в корзины изменения ингредиентов рецептов recipe_ids,
+        сделанные внутри блока with.
+        """
+        with transaction.atomic():
+            recipes = list(Recipe.objects.filter(pk__in=recipe_ids))
+            old_amounts = {
+                recipe.pk: recipe.get_ingredient_amounts()
+                for recipe in recipes
+            }
+            yield
+            for recipe in recipes:
+                self.update_recipe(recipe, old_amounts[recipe.pk])
+
+    def remove_recipe_from_carts(self, recipe):
+        """Вычитает ингредиенты рецепта из всех корзин, где он есть."""
+        self.apply_delta(
+            recipe.shopping_list.values_list('user_id', flat=True),
+            {
+                ingredient_id: -amount
+                for ingredient_id, amount
+                in recipe.get_ingredient_amounts().items()
+            },
+        )
+
+    def update_recipe(self, recipe, old_amounts):
+        """Применяет изменение ингредиентов рецепта ко всем корзинам."""
+        new_amounts = recipe.get_ingredient_amounts()
+        self.apply_delta(
+            recipe.shopping_list.values_list('user_id', flat=True),
+            {
+                ingredient_id: (
+                    new_amounts.get(ingredient_id, 0)
+                    - old_amounts.get(ingredient_id, 0)
+                )
+                for ingredient_id in new_amounts.keys() | old_amounts.keys()
+            },
+        )
+
+    def live_totals(self):
+        """Суммы ингредиентов, посчитанные заново по корзинам."""
+        return IngredientForRecipe.objects.filter(
+            recipe__shopping_list__isnull=False
+        ).values(
+            'recipe__shopping_list__user', 'ingredient'
+        ).annotate(
+            total=Sum('amount')
+        ).order_by()
+
+    def rebuild(self):
+        """Пересоздает таблицу по текущему содержимому корзин."""
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(
+                (
+                    self.model(
+                        user_id=item['recipe__shopping_list__user'],
+                        ingredient_id=item['ingredient'],
+                        total_amount=item['total'],
+                    )
+                    for item in self.live_totals().iterator()
+                ),
+                batch_size=1000,
+            )
+
+
+class ShoppingCartItem(models.Model):
+    """Определение модели суммарного количества ингредиента в корзине."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_cart_items',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_cart_items',
+        verbose_name='Ингредиент'
+    )
+    total_amount = models.IntegerField(
+        default=0,
+        verbose_name='Общее количество'
+    )
+
+    objects = ShoppingCartItemManager()
+
+    class Meta:
+        verbose_name = 'Ингредиент корзины'
+        verbose_name_plural = 'Ингредиенты корзин'
+        ordering = ('user',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_cart_item'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user},{self.ingredient}'
@@ -0,0 +1,44 @@
+import random
+import string
+
+from django.conf import settings
+
+ALPHABET = f'{string.ascii_letters}{string.digits}'
+
+
+def _salted_alphabet():
+    alphabet = list(ALPHABET)
+    random.Random(settings.HASHIDS_SALT).shuffle(alphabet)
+    return ''.join(alphabet)
+
+
+SALTED_ALPHABET = _salted_alphabet()
+
+
+def encode_short_id(pk):
+    """Кодирует id рецепта в короткую строку base62 с солью."""
+    base = len(SALTED_ALPHABET)
+    digits = []
+    while True:
+        pk, remainder = divmod(pk, base)
+        digits.append(SALTED_ALPHABET[remainder])
+        if not pk:
+            return ''.join(reversed(digits))
+
+
+def decode_short_id(short_id):
+    """Возвращает id рецепта по короткой строке или None.
+
+    Строки длиной SHORT_ID_MAX_LENGTH - старые случайные идентификаторы,
+    они не декодируются и ищутся по полю Recipe.short_id.
+    """
+    if not short_id or len(short_id) >= settings.SHORT_ID_MAX_LENGTH:
+        return None
+    base = len(SALTED_ALPHABET)
+    pk = 0
+    for char in short_id:
+        position = SALTED_ALPHABET.find(char)
+        if position < 0:
+            return None
+        pk = pk * base + position
+    return pk
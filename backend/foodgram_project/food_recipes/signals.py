@@ -0,0 +1,121 @@
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from .catalog import (
+    INGREDIENTS,
+    TAGS,
+    bump_catalog_version_on_commit,
+    bump_popularity_version,
+    bump_recipes_version,
+)
+from .images import schedule_derivatives
+from .models import (
+    Favourite,
+    Ingredient,
+    IngredientForRecipe,
+    Recipe,
+    ShoppingCartItem,
+    Tag,
+)
+
+User = get_user_model()
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    """Сбрасывает индекс и ETag ингредиентов после изменения в админке."""
+    bump_catalog_version_on_commit(INGREDIENTS)
+    bump_recipes_version()
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(sender, **kwargs):
+    """Меняет ETag списка тегов после изменения в админке."""
+    bump_catalog_version_on_commit(TAGS)
+    bump_recipes_version()
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=IngredientForRecipe)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_changed(sender, **kwargs):
+    """Сбрасывает кеш списка рецептов."""
+    bump_recipes_version()
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    """Сбрасывает кеш списка рецептов, если изменились данные автора.
+
+    У нового пользователя еще нет рецептов.
+    """
+    if not created and instance.author_changed(update_fields):
+        bump_recipes_version()
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_text_changed(sender, instance, **kwargs):
+    """Обновляет поисковый вектор рецепта."""
+    instance.update_search_vector()
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_changed(sender, instance, **kwargs):
+    """Создает уменьшенные копии нового изображения рецепта."""
+    schedule_derivatives(instance, 'image', 'image_derivatives')
+
+
+@receiver(post_save, sender=User)
+def avatar_changed(sender, instance, **kwargs):
+    """Создает уменьшенные копии нового аватара."""
+    schedule_derivatives(instance, 'avatar', 'avatar_derivatives')
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    """Увеличивает счетчик рецептов автора."""
+    if created:
+        User.objects.filter(pk=instance.author_id).update(
+            recipes_count=F('recipes_count') + 1)
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_removed_from_carts(sender, instance, **kwargs):
+    """Вычитает ингредиенты удаляемого рецепта из корзин.
+
+    pre_delete отправляется и при удалении через QuerySet.delete(),
+    и при каскадном удалении вместе с автором.
+    """
+    ShoppingCartItem.objects.remove_recipe_from_carts(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    """Уменьшает счетчик рецептов автора."""
+    User.objects.filter(pk=instance.author_id, recipes_count__gt=0).update(
+        recipes_count=F('recipes_count') - 1)
+
+
+@receiver(post_save, sender=Favourite)
+def favorite_added(sender, instance, created, **kwargs):
+    """Увеличивает счетчик добавлений рецепта в избранное."""
+    if created:
+        Recipe.objects.filter(pk=instance.recipe_id).update(
+            favorites_count=F('favorites_count') + 1)
+        bump_popularity_version()
+
+
+@receiver(post_delete, sender=Favourite)
+def favorite_removed(sender, instance, **kwargs):
+    """Уменьшает счетчик добавлений рецепта в избранное."""
+    Recipe.objects.filter(
+        pk=instance.recipe_id, favorites_count__gt=0
+    ).update(favorites_count=F('favorites_count') - 1)
+    bump_popularity_version()
@@ -0,0 +1,12 @@
+'use strict';
+{
+    const $ = django.jQuery;
+
+    $(document).on('change', '#changelist-filter select.admin-autocomplete', function() {
+        const params = new URLSearchParams(this.dataset.queryString);
+        if (this.value) {
+            params.set(this.name, this.value);
+        }
+        window.location.search = params.toString();
+    });
+}
@@ -0,0 +1,57 @@
+import pytest
+from django.db import connection
+from django.urls import reverse
+
+# Модель, поле фильтра, запросов без фильтра и с фильтром. В запросы
+# входят сессия и пользователь админки; с фильтром добавляется чтение
+# выбранного в фильтре объекта. У рецептов еще теги и ингредиенты
+# страницы и список тегов для фильтра.
+CHANGELISTS = (
+    ('food_recipes.recipe', 'author', 7, 8),
+    ('food_recipes.favourite', 'user', 4, 5),
+    ('food_recipes.shoppinglist', 'user', 4, 5),
+    ('food_recipes.ingredientforrecipe', 'recipe', 4, 5),
+    ('food_recipes.shoppingcartitem', 'user', 4, 5),
+    ('users.subscription', 'user', 4, 5),
+)
+
+
+@pytest.fixture
+def analyzed(foodgram):
+    """Статистика таблиц для EstimatedCountPaginator в PostgreSQL."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+    return foodgram
+
+
+def get_changelist_url(model):
+    return reverse(f'admin:{model.replace(".", "_")}_changelist')
+
+
+@pytest.mark.parametrize('model, field, queries, filtered_queries',
+                         CHANGELISTS)
+def test_changelist_queries(
+    analyzed, admin_client, django_assert_num_queries,
+    model, field, queries, filtered_queries,
+):
+    with django_assert_num_queries(queries):
+        response = admin_client.get(get_changelist_url(model))
+    assert response.status_code == 200
+    assert response.context['cl'].result_count > 1
+
+
+@pytest.mark.parametrize('model, field, queries, filtered_queries',
+                         CHANGELISTS)
+def test_filtered_changelist_queries(
+    analyzed, admin_client, django_assert_num_queries,
+    model, field, queries, filtered_queries,
+):
+    value = (
+        analyzed.recipes[0] if field == 'recipe' else analyzed.user
+    ).pk
+    with django_assert_num_queries(filtered_queries):
+        response = admin_client.get(
+            get_changelist_url(model), {f'{field}__id__exact': value})
+    assert response.status_code == 200
+    assert response.context['cl'].result_count > 0
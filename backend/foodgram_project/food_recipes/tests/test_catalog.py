@@ -0,0 +1,35 @@
+import pytest
+from django.db import transaction
+
+from food_recipes.catalog import INGREDIENTS, TAGS, get_catalog_version
+from food_recipes.models import Ingredient, Tag
+
+CATALOGS = (
+    (TAGS, lambda: Tag.objects.create(
+        name='Новый тег', slug='new')),
+    (INGREDIENTS, lambda: Ingredient.objects.create(
+        name='Новый ингредиент', measurement_unit='г')),
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+@pytest.mark.parametrize('catalog, create', CATALOGS)
+def test_version_changes_after_commit(transactional_db, catalog, create):
+    version = get_catalog_version(catalog)
+    with transaction.atomic():
+        create()
+        assert get_catalog_version(catalog) == version
+    assert get_catalog_version(catalog) != version
+
+
+@pytest.mark.parametrize('catalog, create', CATALOGS)
+def test_version_kept_after_rollback(transactional_db, catalog, create):
+    version = get_catalog_version(catalog)
+    with pytest.raises(Rollback):
+        with transaction.atomic():
+            create()
+            raise Rollback
+    assert get_catalog_version(catalog) == version
@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+
+from food_recipes.models import Favourite, Recipe
+
+User = get_user_model()
+
+
+def test_recipe_save_keeps_concurrent_favorites(foodgram):
+    recipe = Recipe.objects.get(pk=foodgram.recipes[-1].pk)
+    Favourite.objects.add_recipe(foodgram.users[1], recipe.pk)
+    recipe.name = 'Новое название'
+    recipe.save()
+    recipe.refresh_from_db()
+    assert recipe.name == 'Новое название'
+    assert recipe.favorites_count == 1
+
+
+def test_explicit_counter_update_is_saved(foodgram):
+    recipe = Recipe.objects.get(pk=foodgram.recipes[-1].pk)
+    recipe.favorites_count = 5
+    recipe.save(update_fields=('favorites_count',))
+    recipe.refresh_from_db()
+    assert recipe.favorites_count == 5
+
+
+def test_user_save_keeps_concurrent_recipes_count(foodgram):
+    user = User.objects.get(pk=foodgram.user.pk)
+    Recipe.objects.create(
+        author=foodgram.user, name='Еще рецепт', text='Описание',
+        cooking_time=5, image='food_recipes/recipe.png',
+    )
+    user.first_name = 'Новое имя'
+    user.save()
+    user.refresh_from_db()
+    assert user.first_name == 'Новое имя'
+    assert user.recipes_count == 3
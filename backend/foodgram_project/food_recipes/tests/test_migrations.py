@@ -0,0 +1,68 @@
+import pytest
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+
+@pytest.fixture
+def migrate(transactional_db):
+    """Переводит базу на миграцию food_recipes и возвращает модели.
+
+    Модели соответствуют всем примененным миграциям, в том числе
+    миграциям users, которые при откате остаются на месте.
+    """
+    executor = MigrationExecutor(connection)
+
+    def run(name):
+        executor.loader.build_graph()
+        executor.migrate([('food_recipes', name)])
+        executor.loader.build_graph()
+        return executor.loader.project_state(
+            list(executor.loader.applied_migrations)).apps
+
+    yield run
+    executor.loader.build_graph()
+    executor.migrate(executor.loader.graph.leaf_nodes())
+
+
+def test_duplicate_ingredients_are_merged(migrate):
+    apps = migrate('0004_shoppingcartitem')
+    User = apps.get_model('users', 'User')
+    Ingredient = apps.get_model('food_recipes', 'Ingredient')
+    Recipe = apps.get_model('food_recipes', 'Recipe')
+    IngredientForRecipe = apps.get_model('food_recipes', 'IngredientForRecipe')
+    author = User.objects.create(
+        email='author@foodgram.ru', username='author')
+    Ingredient.objects.bulk_create(
+        Ingredient(name=name, measurement_unit='г')
+        for name in ('Соль', 'Соль', 'Сахар')
+    )
+    salt, duplicate, sugar = Ingredient.objects.order_by('pk')
+    recipes = [
+        Recipe.objects.create(
+            author=author, name=f'Рецепт {index}', text='Описание',
+            cooking_time=10, image='food_recipes/recipe.png',
+            short_id=f'r{index}',
+        )
+        for index in range(2)
+    ]
+    IngredientForRecipe.objects.bulk_create([
+        IngredientForRecipe(recipe=recipes[0], ingredient=salt, amount=5),
+        IngredientForRecipe(
+            recipe=recipes[0], ingredient=duplicate, amount=7),
+        IngredientForRecipe(recipe=recipes[0], ingredient=sugar, amount=1),
+        IngredientForRecipe(
+            recipe=recipes[1], ingredient=duplicate, amount=3),
+    ])
+
+    apps = migrate('0005_unique_ingredient')
+    Ingredient = apps.get_model('food_recipes', 'Ingredient')
+    IngredientForRecipe = apps.get_model('food_recipes', 'IngredientForRecipe')
+    assert list(Ingredient.objects.order_by('pk').values_list(
+        'pk', flat=True)) == [salt.pk, sugar.pk]
+    assert sorted(IngredientForRecipe.objects.values_list(
+        'recipe_id', 'ingredient_id', 'amount'
+    )) == [
+        (recipes[0].pk, salt.pk, 12),
+        (recipes[0].pk, sugar.pk, 1),
+        (recipes[1].pk, salt.pk, 3),
+    ]
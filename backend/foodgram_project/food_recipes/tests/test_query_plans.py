@@ -0,0 +1,203 @@
+import re
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from food_recipes.models import (
+    Favourite,
+    Ingredient,
+    IngredientForRecipe,
+    Recipe,
+    ShoppingCartItem,
+    ShoppingList,
+    Tag,
+)
+from users.models import Subscription
+
+User = get_user_model()
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='Планы запросов проверяются только в PostgreSQL',
+)
+
+JOIN_TABLES = tuple(
+    model._meta.db_table for model in (
+        Favourite,
+        ShoppingList,
+        IngredientForRecipe,
+        ShoppingCartItem,
+        Subscription,
+        Recipe.tags.through,
+    )
+)
+
+STATEMENTS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+# QuerySet.iterator() в PostgreSQL читает через серверный курсор:
+# DECLARE "_django_curs_..." NO SCROLL CURSOR WITH HOLD FOR SELECT ...
+CURSOR_PREFIX = re.compile(
+    r'^\s*DECLARE\s+"[^"]+"\s+(?:NO\s+)?SCROLL\s+CURSOR\s+'
+    r'(?:WITH(?:OUT)?\s+HOLD\s+)?FOR\s+',
+    re.IGNORECASE,
+)
+
+
+@pytest.fixture
+def seeded(db):
+    """Несколько тысяч строк в связующих таблицах и свежая статистика.
+
+    На маленьких таблицах планировщик вправе выбрать Seq Scan, поэтому
+    он отключается: Seq Scan в плане тогда значит, что подходящего
+    индекса нет.
+    """
+    User.objects.bulk_create(
+        User(
+            email=f'user{index}@foodgram.ru',
+            username=f'user{index}',
+            first_name='Имя',
+            last_name='Фамилия',
+        )
+        for index in range(60)
+    )
+    users = list(User.objects.order_by('pk'))
+    Tag.objects.bulk_create(
+        Tag(name=f'Тег {index}', slug=f'tag{index}') for index in range(10)
+    )
+    tags = list(Tag.objects.order_by('pk'))
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f'Ингредиент {index}', measurement_unit='г')
+        for index in range(300)
+    )
+    ingredients = list(Ingredient.objects.order_by('pk'))
+    Recipe.objects.bulk_create(
+        Recipe(
+            author=users[index % len(users)],
+            name=f'Рецепт {index}',
+            text='Описание',
+            cooking_time=10,
+            image='food_recipes/recipe.png',
+        )
+        for index in range(600)
+    )
+    recipes = list(Recipe.objects.order_by('pk'))
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe=recipe, tag=tags[index % len(tags)])
+        for index, recipe in enumerate(recipes)
+    )
+    IngredientForRecipe.objects.bulk_create(
+        IngredientForRecipe(
+            recipe=recipe,
+            ingredient=ingredients[(index * 7 + offset) % len(ingredients)],
+            amount=offset + 1,
+        )
+        for index, recipe in enumerate(recipes)
+        for offset in range(5)
+    )
+    for model in (Favourite, ShoppingList):
+        model.objects.bulk_create(
+            model(user=user, recipe=recipes[(index * 11 + offset) % 600])
+            for index, user in enumerate(users)
+            for offset in range(40)
+        )
+    Subscription.objects.bulk_create(
+        Subscription(user=user, author=users[(index + offset) % 60])
+        for index, user in enumerate(users)
+        for offset in range(1, 20)
+    )
+    ShoppingCartItem.objects.rebuild()
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+        cursor.execute('SET LOCAL enable_seqscan = off')
+    client = APIClient()
+    client.force_authenticate(users[0])
+    return client, users, recipes
+
+
+def assert_no_seq_scans(function):
+    """Выполняет function и проверяет план каждого ее запроса.
+
+    У запросов через серверный курсор проверяется сам SELECT.
+    """
+    with CaptureQueriesContext(connection) as context:
+        function()
+    checked = 0
+    for query in context.captured_queries:
+        sql = CURSOR_PREFIX.sub('', query['sql'])
+        if not sql.lstrip().upper().startswith(STATEMENTS):
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN {sql}')
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+        for table in JOIN_TABLES:
+            assert f'Seq Scan on {table}' not in plan, f'{sql}\n{plan}'
+        checked += 1
+    assert checked
+
+
+@pytest.mark.parametrize('url', (
+    '/api/recipes/',
+    '/api/recipes/?is_favorited=1',
+    '/api/recipes/?is_in_shopping_cart=1',
+    '/api/recipes/?tags=tag1&tags=tag2',
+    '/api/users/subscriptions/?recipes_limit=3',
+    '/api/recipes/download_shopping_cart/',
+))
+def test_reads_use_indexes(seeded, url):
+    client, _, _ = seeded
+    assert_no_seq_scans(lambda: b''.join(client.get(url)))
+
+
+def test_author_filter_uses_index(seeded):
+    client, users, _ = seeded
+    assert_no_seq_scans(
+        lambda: client.get(f'/api/recipes/?author={users[1].pk}'))
+
+
+@pytest.mark.parametrize('action', ('favorite', 'shopping_cart'))
+def test_add_remove_use_indexes(seeded, action):
+    client, _, recipes = seeded
+    url = reverse(f'api:recipes-{action}', args=(recipes[-1].pk,))
+    assert_no_seq_scans(lambda: client.post(url))
+    assert_no_seq_scans(lambda: client.delete(url))
+
+
+@pytest.mark.parametrize('action', ('favorite_batch', 'shopping_cart_batch'))
+def test_batch_add_remove_use_indexes(seeded, action):
+    client, _, recipes = seeded
+    url = reverse(f'api:recipes-{action}')
+    data = {'recipes': [recipe.pk for recipe in recipes[-20:]]}
+    assert_no_seq_scans(lambda: client.post(url, data, format='json'))
+    assert_no_seq_scans(lambda: client.delete(url, data, format='json'))
+
+
+def test_subscribe_uses_indexes(seeded):
+    client, users, _ = seeded
+    url = reverse('api:users-subscribe', args=(users[-1].pk,))
+    assert_no_seq_scans(lambda: client.delete(url))
+    assert_no_seq_scans(lambda: client.post(url))
+
+
+def test_cart_aggregation_uses_indexes(seeded):
+    client, users, recipes = seeded
+    recipe = ShoppingList.objects.filter(user=users[0]).first().recipe
+    recipe.author = users[0]
+    recipe.save()
+    assert_no_seq_scans(lambda: client.patch(
+        reverse('api:recipes-detail', args=(recipe.pk,)),
+        {
+            'ingredients': [
+                {'id': ingredient_id, 'amount': amount + 1}
+                for ingredient_id, amount
+                in recipe.get_ingredient_amounts().items()
+            ],
+            'tags': list(recipe.tags.values_list('pk', flat=True)),
+        },
+        format='json',
+    ))
+    assert_no_seq_scans(lambda: client.delete(
+        reverse('api:recipes-detail', args=(recipe.pk,))))
@@ -0,0 +1,64 @@
+from django.db import connections, router
+
+
+def insert_ignore(model, source_field, **values):
+    """Добавляет строку model одним INSERT ... SELECT.
+
+    values — id связанных объектов по именам полей. Строка вставляется,
+    только если объект, на который ссылается поле source_field, существует;
+    нарушение уникальности не вызывает ошибку (ON CONFLICT DO NOTHING).
+    Возвращает True, если строка добавлена.
+    """
+    connection = connections[router.db_for_write(model)]
+    ops = connection.ops
+    quote = ops.quote_name
+    columns = ', '.join(
+        quote(model._meta.get_field(name).column) for name in values
+    )
+    source = model._meta.get_field(source_field).remote_field.model._meta
+    sql = (
+        f'{ops.insert_statement(ignore_conflicts=True)} '
+        f'{quote(model._meta.db_table)} ({columns}) '
+        f'SELECT {", ".join(["%s"] * len(values))} '
+        f'FROM {quote(source.db_table)} '
+        f'WHERE {quote(source.pk.column)} = %s '
+        f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*values.values(), values[source_field]])
+        return cursor.rowcount == 1
+
+
+def insert_ignore_many(model, source_field, source_ids, **values):
+    """Добавляет строки model для нескольких объектов source_field.
+
+    Одним INSERT ... SELECT ... RETURNING вставляет строку для каждого
+    существующего id из source_ids, пропуская уже добавленные. Возвращает
+    id из source_ids, строки для которых вставил именно этот запрос, так
+    что два одинаковых параллельных запроса не засчитают строку дважды.
+    Нужна поддержка RETURNING (features.can_return_rows_from_bulk_insert).
+    """
+    connection = connections[router.db_for_write(model)]
+    ops = connection.ops
+    quote = ops.quote_name
+    target = model._meta.get_field(source_field)
+    columns = ', '.join(
+        quote(model._meta.get_field(name).column)
+        for name in (*values, source_field)
+    )
+    source = target.remote_field.model._meta
+    returning_sql, _ = ops.return_insert_columns([target])
+    sql = (
+        f'{ops.insert_statement(ignore_conflicts=True)} '
+        f'{quote(model._meta.db_table)} ({columns}) '
+        f'SELECT {"%s, " * len(values)}{quote(source.pk.column)} '
+        f'FROM {quote(source.db_table)} '
+        f'WHERE {quote(source.pk.column)} IN '
+        f'({", ".join(["%s"] * len(source_ids))}) '
+        f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)} '
+        f'{returning_sql}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*values.values(), *source_ids])
+        inserted = {row[0] for row in cursor.fetchall()}
+    return [pk for pk in source_ids if pk in inserted]
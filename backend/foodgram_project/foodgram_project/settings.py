@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -33,16 +34,19 @@ INSTALLED_APPS = [
     'api',
     'users',
     'food_recipes',
+    'jobs',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram_project.urls'
@@ -118,11 +122,29 @@ STATICFILES_DIRS = ((BASE_DIR / 'static/'),)
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION',
+            os.path.join(tempfile.gettempdir(), 'foodgram_cache')
+        ),
+    }
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
 
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
         'rest_framework.authentication.BasicAuthentication',
@@ -165,6 +187,16 @@ FIELD_MAX_LENGTH = 150
 
 SHORT_ID_MAX_LENGTH = 10
 
+IMAGE_THUMBNAIL_WIDTH = 480
+
+IMAGE_QUALITY = 80
+
+JOB_MAX_ATTEMPTS = 3
+
+JOB_RETRY_DELAY = 10
+
+JOB_LEASE_TIMEOUT = 600
+
 NAME_RECIPE_MAX_LENGTH = 256
 
 MEASUREMENT_UNIT_MAX_LENGTH = 64
@@ -172,3 +204,42 @@ MEASUREMENT_UNIT_MAX_LENGTH = 64
 NAME_INGREDIENT_MAX_LENGTH = 128
 
 PAGE_SIZE = 6
+
+RECIPES_BATCH_MAX_SIZE = 100
+
+SEARCH_CONFIG = 'russian'
+
+DB_STATS_HEADERS = os.getenv('DB_STATS_HEADERS', str(DEBUG)) == 'True'
+
+QUERY_BUDGETS = {
+    'api:recipes-list': {'GET': 8, 'POST': 18},
+    'api:recipes-detail': {'GET': 7, 'PATCH': 30, 'DELETE': 21},
+    'api:recipes-favorite': {'POST': 6, 'DELETE': 5},
+    'api:recipes-shopping_cart': {'POST': 11, 'DELETE': 10},
+    'api:recipes-favorite_batch': {'POST': 7, 'DELETE': 7},
+    'api:recipes-shopping_cart_batch': {'POST': 12, 'DELETE': 12},
+    'api:recipes-download_shopping_cart': {'GET': 2},
+    'api:recipes-get-link': {'GET': 6},
+    'api:users-list': {'GET': 5, 'POST': 4},
+    'api:users-detail': {'GET': 4},
+    'api:users-me': {'GET': 3},
+    'api:users-avatar': {'PUT': 5, 'DELETE': 5},
+    'api:users-subscriptions': {'GET': 6},
+    'api:users-subscribe': {'POST': 6, 'DELETE': 4},
+    'api:tags-list': {'GET': 2},
+    'api:tags-detail': {'GET': 2},
+    'api:ingredients-list': {'GET': 2},
+    'api:ingredients-detail': {'GET': 2},
+}
+
+CATALOG_CACHE_MAX_AGE = 60
+
+RECIPE_LIST_CACHE_TIMEOUT = int(os.getenv('RECIPE_LIST_CACHE_TIMEOUT', 300))
+
+RECIPE_FAST_READ = os.getenv('RECIPE_FAST_READ', 'False') == 'True'
+
+COMPRESSION_PATH_PREFIX = '/api/'
+
+COMPRESSION_MIN_SIZE = 1024
+
+BROTLI_QUALITY = 5
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from jobs.tasks import claim_job, run_job
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из таблицы Job.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Завершиться, когда готовых задач не останется.',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1.0,
+            help='Пауза в секундах, если задач нет.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            job = claim_job()
+            if job is None:
+                if options['burst']:
+                    return
+                time.sleep(options['sleep'])
+                continue
+            status = run_job(job)
+            self.stdout.write(f'{job.pk} {job.name}: {status}')
@@ -0,0 +1,79 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Определение модели фоновой задачи."""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'Ожидает'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(
+        max_length=255,
+        verbose_name='Функция'
+    )
+    args = models.JSONField(
+        default=list,
+        verbose_name='Аргументы'
+    )
+    kwargs = models.JSONField(
+        default=dict,
+        verbose_name='Именованные аргументы'
+    )
+    status = models.CharField(
+        max_length=16,
+        choices=STATUSES,
+        default=PENDING,
+        verbose_name='Статус'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток'
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        default=3,
+        verbose_name='Максимум попыток'
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Запустить после'
+    )
+    claimed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Захвачена'
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Создана'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Изменена'
+    )
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        ordering = ('run_at',)
+        indexes = [
+            models.Index(
+                fields=('status', 'run_at'),
+                name='job_status_run_at_idx'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.get_status_display()})'
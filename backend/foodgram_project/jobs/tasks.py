@@ -0,0 +1,109 @@
+import functools
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+
+def task(func=None, *, max_attempts=None, unique=False):
+    """Делает функцию фоновой задачей.
+
+    Функция по-прежнему вызывается напрямую, а func.delay(*args, **kwargs)
+    записывает задачу в таблицу Job в текущей транзакции. Аргументы
+    должны сериализоваться в JSON. С unique=True delay возвращает уже
+    ожидающую задачу с теми же аргументами вместо новой.
+    """
+    if func is None:
+        return functools.partial(
+            task, max_attempts=max_attempts, unique=unique)
+
+    name = f'{func.__module__}.{func.__qualname__}'
+
+    def delay(*args, **kwargs):
+        if unique:
+            job = Job.objects.filter(
+                name=name, args=list(args), kwargs=kwargs,
+                status=Job.PENDING,
+            ).first()
+            if job is not None:
+                return job
+        return Job.objects.create(
+            name=name,
+            args=list(args),
+            kwargs=kwargs,
+            max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        )
+
+    func.delay = delay
+    return func
+
+
+def claim_job():
+    """Забирает одну готовую к запуску задачу или возвращает None.
+
+    В PostgreSQL строка блокируется через SELECT ... FOR UPDATE SKIP LOCKED,
+    в SQLite задача захватывается условным UPDATE по статусу.
+
+    Захват - аренда на JOB_LEASE_TIMEOUT секунд: run_at выполняющейся
+    задачи сдвигается на конец аренды. Если воркер упал и задача не
+    завершилась к этому времени, ее снова забирает другой воркер, а при
+    исчерпанных попытках она помечается ошибкой.
+    """
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    while True:
+        with transaction.atomic():
+            now = timezone.now()
+            queryset = Job.objects.filter(
+                status__in=(Job.PENDING, Job.RUNNING), run_at__lte=now
+            ).order_by('run_at')
+            if skip_locked:
+                queryset = queryset.select_for_update(skip_locked=True)
+            job = queryset.first()
+            if job is None:
+                return None
+            current = Job.objects.filter(
+                pk=job.pk, status=job.status, run_at=job.run_at)
+            if job.status == Job.RUNNING and (
+                job.attempts >= job.max_attempts
+            ):
+                current.update(
+                    status=Job.FAILED, updated_at=now,
+                    last_error='Задача не завершилась до конца аренды.',
+                )
+                continue
+            lease_until = now + timedelta(seconds=settings.JOB_LEASE_TIMEOUT)
+            claimed = current.update(
+                status=Job.RUNNING, attempts=job.attempts + 1,
+                claimed_at=now, run_at=lease_until,
+            )
+            if not claimed:
+                return None
+        job.status = Job.RUNNING
+        job.attempts += 1
+        job.claimed_at = now
+        job.run_at = lease_until
+        return job
+
+
+def run_job(job):
+    """Выполняет задачу и планирует повтор с экспоненциальной паузой."""
+    try:
+        import_string(job.name)(*job.args, **job.kwargs)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.PENDING
+            job.run_at = timezone.now() + timedelta(
+                seconds=settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            )
+        else:
+            job.status = Job.FAILED
+    else:
+        job.status = Job.DONE
+    job.save(update_fields=('status', 'run_at', 'last_error', 'updated_at'))
+    return job.status
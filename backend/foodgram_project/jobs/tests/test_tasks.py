@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.tasks import claim_job, run_job, task
+
+calls = []
+
+
+@task(unique=True)
+def record(value):
+    calls.append(value)
+
+
+@pytest.fixture
+def expire_lease():
+    """Сдвигает конец аренды задачи в прошлое, как будто воркер упал."""
+
+    def expire(job):
+        Job.objects.filter(pk=job.pk).update(
+            run_at=timezone.now() - timedelta(seconds=1))
+
+    return expire
+
+
+def test_claim_sets_lease(db, settings):
+    record.delay(1)
+    job = claim_job()
+    assert job.status == Job.RUNNING
+    assert job.run_at - job.claimed_at == timedelta(
+        seconds=settings.JOB_LEASE_TIMEOUT)
+    assert claim_job() is None
+
+
+def test_expired_lease_is_claimed_again(db, expire_lease):
+    record.delay('lease')
+    job = claim_job()
+    expire_lease(job)
+    reclaimed = claim_job()
+    assert reclaimed.pk == job.pk
+    assert reclaimed.attempts == 2
+    assert run_job(reclaimed) == Job.DONE
+    assert calls[-1] == 'lease'
+
+
+def test_expired_lease_without_attempts_fails(db, expire_lease):
+    job = record.delay(1)
+    Job.objects.filter(pk=job.pk).update(max_attempts=1)
+    expire_lease(claim_job())
+    assert claim_job() is None
+    job.refresh_from_db()
+    assert job.status == Job.FAILED
+    assert job.last_error
+
+
+def test_unique_task_reuses_pending_job(db):
+    job = record.delay(1)
+    assert record.delay(1) == job
+    assert record.delay(2) != job
+    claim_job()
+    assert record.delay(1) != job
+    assert Job.objects.count() == 3
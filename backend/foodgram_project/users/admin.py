@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
+from food_recipes.admin_utils import AutocompleteFilter, LargeTableAdmin
+
 from .models import Subscription, User
 
 
@@ -14,12 +16,12 @@ class MyUserAdmin(UserAdmin):
 
 
 @admin.register(Subscription)
-class SubscriptionAdmin(admin.ModelAdmin):
+class SubscriptionAdmin(LargeTableAdmin):
     list_display = ('id', 'user', 'author')
     list_display_links = ('user', 'author')
-    list_filter = ('user__username',)
-
-    def get_queryset(self, request):
-        """Оптимизация запросов."""
-        queryset = super().get_queryset(request)
-        return queryset.select_related('user', 'author')
+    list_filter = (
+        ('user', AutocompleteFilter),
+        ('author', AutocompleteFilter),
+    )
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.16 on 2025-03-17 10:02
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_user_avatar_derivatives'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='subscription',
+            unique_together=set(),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.2.16 on 2025-03-19 11:24
+
+from django.db import migrations, models
+
+
+def fill_recipes_count(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    Recipe = apps.get_model('food_recipes', 'Recipe')
+    recipes = Recipe.objects.filter(
+        author=models.OuterRef('pk')
+    ).order_by().values('author').annotate(
+        total=models.Count('pk')
+    ).values('total')
+    User.objects.update(recipes_count=models.functions.Coalesce(
+        models.Subquery(recipes), 0
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_alter_subscription_unique_together'),
+        ('food_recipes', '0009_join_table_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество рецептов'),
+        ),
+        migrations.RunPython(
+            fill_recipes_count, migrations.RunPython.noop
+        ),
+    ]
@@ -3,13 +3,20 @@ from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.db import models
 
+from food_recipes.counters import CounterFieldsMixin
+from food_recipes.upserts import insert_ignore
 
-class User(AbstractUser):
+
+class User(CounterFieldsMixin, AbstractUser):
     """Определение расширенной модели пользователя."""
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username', 'first_name',
                        'last_name')
+    counter_fields = ('recipes_count',)
+    # Поля, которые выводятся в рецептах как данные автора.
+    AUTHOR_FIELDS = frozenset(('email', 'username', 'first_name',
+                               'last_name', 'avatar', 'avatar_derivatives'))
 
     email = models.EmailField(
         verbose_name='Электронная почта',
@@ -36,6 +43,17 @@ class User(AbstractUser):
         blank=True,
         upload_to='avatars'
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество рецептов'
+    )
+    avatar_derivatives = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Уменьшенные копии аватара'
+    )
 
     class Meta:
         ordering = ('username', 'date_joined')
@@ -45,6 +63,61 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_author = instance._get_author_values(
+            zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        deferred = self.get_deferred_fields()
+        self._loaded_author = self._get_author_values(
+            (name, getattr(self, name))
+            for name in self.AUTHOR_FIELDS if name not in deferred
+        )
+
+    def _get_author_values(self, items):
+        return {
+            name: self._meta.get_field(name).get_prep_value(value)
+            for name, value in items if name in self.AUTHOR_FIELDS
+        }
+
+    def author_changed(self, update_fields=None):
+        """Изменились ли при сохранении данные автора.
+
+        Вход по токену (last_login) и смена пароля их не меняют. Поля
+        из update_fields сравниваются с загруженными из базы значениями.
+        """
+        names = self.AUTHOR_FIELDS
+        if update_fields is not None:
+            names = names.intersection(update_fields)
+        loaded = getattr(self, '_loaded_author', None)
+        if loaded is None:
+            return bool(names)
+        return any(
+            name not in loaded or value != loaded[name]
+            for name, value in self._get_author_values(
+                (name, getattr(self, name)) for name in names
+            ).items()
+        )
+
+
+class SubscriptionManager(models.Manager):
+    """Подписка и отписка одним запросом к базе."""
+
+    def subscribe(self, user, author_id):
+        """Возвращает False, если подписка уже есть или автора нет."""
+        return insert_ignore(
+            self.model, 'author', user=user.pk, author=author_id)
+
+    def unsubscribe(self, user, author_id):
+        """Возвращает False, если подписки не было."""
+        return self.filter(
+            user=user, author_id=author_id
+        )._raw_delete(self.db) > 0
+
 
 class Subscription(models.Model):
     """Определение модели подписок."""
@@ -62,11 +135,12 @@ class Subscription(models.Model):
         verbose_name='Автор',
     )
 
+    objects = SubscriptionManager()
+
     class Meta:
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
         ordering = ('user',)
-        unique_together = ('user', 'author')
         constraints = [
             models.UniqueConstraint(
                 fields=('user', 'author'),